@@ -0,0 +1,142 @@
+"""
+Excel批量操作工具箱 - 准入控制
+根据上传大小和操作类型估算每个请求的内存占用，超出预算时排队或拒绝
+计数保存在进程内，多进程部署时每个进程使用总预算的一部分（见app.py的SERVER_WORKERS）
+Author: StanleyChanH
+License: MIT
+"""
+
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+# 各操作的内存放大系数：解析为DataFrame并生成输出时，内存占用约为上传大小的倍数
+MEMORY_FACTORS = {
+    'merge_files': 6,
+    'merge_sheets': 6,
+    'split_by_column': 8,
+    'split_by_rows': 6,
+    'find_replace': 5,
+    'delete_columns': 5,
+    'filter_data': 5,
+    'convert_format': 5,
+    'pipeline': 8,
+    'profile': 2,  # 按块读取，内存占用与行数基本无关
+}
+DEFAULT_MEMORY_FACTOR = 6
+
+# 每个请求的最小内存估算（解析库本身的开销）
+MIN_REQUEST_COST = 32 * 1024 * 1024
+
+
+class AdmissionRejected(Exception):
+    """请求未被准入，retry_after为建议的重试等待秒数"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'retry after {retry_after}s')
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    进程内的内存预算 + 每个操作的并发上限
+    无法立即执行的请求最多排队queue_timeout秒，队列已满或超时则拒绝
+    """
+
+    def __init__(self, memory_budget, concurrency_limits=None, default_concurrency=4,
+                 queue_timeout=30, max_queue_depth=16):
+        self.memory_budget = memory_budget
+        self.concurrency_limits = dict(concurrency_limits or {})
+        self.default_concurrency = default_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_queue_depth = max_queue_depth
+
+        self._condition = threading.Condition()
+        self._memory_in_use = 0
+        self._active = {}
+        self._waiting = {}
+        self._admitted = {}
+        self._rejected = {}
+        self._avg_duration = {}
+        self._peak_queue_depth = 0
+
+    def estimate_cost(self, operation, upload_bytes):
+        """估算请求的内存占用（字节），不超过预算，保证单个大请求在空闲时仍能执行"""
+        cost = max(upload_bytes * MEMORY_FACTORS.get(operation, DEFAULT_MEMORY_FACTOR), MIN_REQUEST_COST)
+        return min(cost, self.memory_budget)
+
+    def _limit(self, operation):
+        return self.concurrency_limits.get(operation, self.default_concurrency)
+
+    def _can_run(self, operation, cost):
+        return (self._memory_in_use + cost <= self.memory_budget
+                and self._active.get(operation, 0) < self._limit(operation))
+
+    def _retry_after(self, operation):
+        """按该操作的平均耗时和排队长度估算重试时间"""
+        queue_depth = sum(self._waiting.values()) + 1
+        return max(1, math.ceil(self._avg_duration.get(operation, 5.0) * queue_depth / self._limit(operation)))
+
+    def _reject(self, operation):
+        self._rejected[operation] = self._rejected.get(operation, 0) + 1
+        return AdmissionRejected(self._retry_after(operation))
+
+    @contextmanager
+    def admit(self, operation, cost):
+        """
+        准入请求，离开上下文时释放占用
+        无法准入时抛出AdmissionRejected
+        """
+        with self._condition:
+            if not self._can_run(operation, cost):
+                if sum(self._waiting.values()) >= self.max_queue_depth:
+                    raise self._reject(operation)
+
+                self._waiting[operation] = self._waiting.get(operation, 0) + 1
+                self._peak_queue_depth = max(self._peak_queue_depth, sum(self._waiting.values()))
+                try:
+                    admitted = self._condition.wait_for(
+                        lambda: self._can_run(operation, cost), timeout=self.queue_timeout)
+                finally:
+                    self._waiting[operation] -= 1
+                if not admitted:
+                    raise self._reject(operation)
+
+            self._memory_in_use += cost
+            self._active[operation] = self._active.get(operation, 0) + 1
+            self._admitted[operation] = self._admitted.get(operation, 0) + 1
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            duration = time.monotonic() - start
+            with self._condition:
+                self._memory_in_use -= cost
+                self._active[operation] -= 1
+                previous = self._avg_duration.get(operation, duration)
+                self._avg_duration[operation] = 0.8 * previous + 0.2 * duration
+                self._condition.notify_all()
+
+    def stats(self):
+        """当前准入状态和累计计数"""
+        with self._condition:
+            operations = sorted(set(self._admitted) | set(self._waiting) | set(self._rejected))
+            return {
+                'memory_budget': self.memory_budget,
+                'memory_in_use': self._memory_in_use,
+                'queue_depth': sum(self._waiting.values()),
+                'peak_queue_depth': self._peak_queue_depth,
+                'operations': {
+                    op: {
+                        'active': self._active.get(op, 0),
+                        'waiting': self._waiting.get(op, 0),
+                        'concurrency_limit': self._limit(op),
+                        'admitted': self._admitted.get(op, 0),
+                        'rejected': self._rejected.get(op, 0),
+                        'avg_duration': round(self._avg_duration.get(op, 0.0), 3),
+                    }
+                    for op in operations
+                },
+            }
@@ -7,16 +7,114 @@ License: MIT
 
 import os
 import io
+import sys
+import gc
+import hmac
+import json
+import time
+import random
+import platform
+import cProfile
+import threading
 import zipfile
 import tempfile
+import functools
+import hashlib
+import importlib
+import importlib.metadata
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Request, render_template, request, jsonify, send_file, g, has_request_context
 from werkzeug.utils import secure_filename
-import pandas as pd
-import openpyxl
+from werkzeug.datastructures import FileStorage
+from result_store import ResultStore, compute_result_id
+from input_handles import InputHandle, create_temp_file, cleanup_stale_files
+from xlsx_inplace import replace_in_workbook
+from admission import AdmissionController, AdmissionRejected
+from profiling import ProfileStore
+from chunked_uploads import UploadStore, UploadError, UploadStoreFull
+from csv_reader import read_csv_file, count_csv_rows, iter_csv_chunks
+from xlsx_stream import (
+    EXCEL_MAX_ROWS, write_workbook, split_rows, workbook_sheets, count_sheet_rows, iter_sheet_chunks,
+)
+from parallel_sheets import sheet_sizes, read_sheets_parallel
+from column_profile import TableProfile, estimate_distinct
+from merge_masters import MasterStore, compute_master_key
+
+class LazyModule:
+    """
+    延迟导入的模块代理，第一次访问属性时才真正导入
+    主页、错误页等不处理数据的请求不需要加载pandas
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+pd = LazyModule('pandas')
+
+class UploadRequest(Request):
+    """上传文件直接写入上传临时目录，之后由InputHandle接管，避免再复制一次"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        sweep_stale_uploads()
+        stream = create_temp_file(app.config['UPLOAD_TEMP_DIR'])
+        self.__dict__.setdefault('upload_temp_files', []).append(stream)
+        return stream
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size
+app.config['UPLOAD_TEMP_DIR'] = os.path.join(tempfile.gettempdir(), 'excel_toolkit_uploads')
+app.config['RESULT_STORE_DIR'] = os.path.join(tempfile.gettempdir(), 'excel_toolkit_results')
+app.config['RESULT_STORE_MAX_BYTES'] = 2 * 1024 * 1024 * 1024  # 结果存储最多占用2GB
+app.config['RESULT_STORE_TTL'] = 24 * 60 * 60  # 结果保留24小时
+app.config['ADMISSION_MEMORY_BUDGET'] = 2 * 1024 * 1024 * 1024  # 所有处理中请求的估算内存总和上限
+# 服务进程数（gunicorn同样以WEB_CONCURRENCY作为默认的worker数）；准入控制在每个进程内独立计数，内存预算按进程数平分
+app.config['SERVER_WORKERS'] = int(os.environ.get('WEB_CONCURRENCY', '1'))
+app.config['ADMISSION_CONCURRENCY'] = {'merge_files': 2, 'merge_sheets': 2, 'split_by_column': 2, 'pipeline': 2}
+app.config['ADMISSION_DEFAULT_CONCURRENCY'] = 4  # 未单独配置的操作的并发上限
+app.config['ADMISSION_QUEUE_TIMEOUT'] = 30  # 排队等待的最长秒数
+app.config['ADMISSION_MAX_QUEUE_DEPTH'] = 16  # 排队请求数上限，超出直接拒绝
+app.config['UPLOAD_STORE_DIR'] = os.path.join(tempfile.gettempdir(), 'excel_toolkit_chunked_uploads')
+app.config['UPLOAD_CHUNK_SIZE'] = 4 * 1024 * 1024  # 分块上传的块大小（前端使用相同的值）
+app.config['UPLOAD_MAX_FILE_SIZE'] = 2 * 1024 * 1024 * 1024  # 分块上传的单个文件上限
+app.config['UPLOAD_STORE_TTL'] = 24 * 60 * 60  # 分块上传的文件保留24小时
+app.config['UPLOAD_STORE_MAX_BYTES'] = 8 * 1024 * 1024 * 1024  # 分块上传的文件（含上传中预分配的空间）总共最多占用8GB
+app.config['UPLOAD_MAX_SESSIONS'] = 20  # 同时进行中的分块上传数上限
+app.config['ADMIN_TOKEN'] = os.environ.get('EXCEL_TOOLKIT_ADMIN_TOKEN')  # 管理接口令牌，未设置时管理接口不可用
+app.config['PROFILING_SAMPLE_RATE'] = 0.0  # 自动进行性能分析的请求比例（0表示关闭）
+app.config['PROFILE_DIR'] = os.path.join(tempfile.gettempdir(), 'excel_toolkit_profiles')
+app.config['PROFILE_MAX_COUNT'] = 100  # 最多保留的性能分析结果数
+app.config['EXCEL_MAX_ROWS'] = EXCEL_MAX_ROWS  # 单个sheet的行数上限（含表头），超出时续写到下一个sheet
+# 合并Sheet时并行解析sheet的进程数，默认1（不并行）
+# 大于1时每个服务进程会常驻这么多个解析进程，其内存不计入准入控制的预算，开启时应相应调低ADMISSION_MEMORY_BUDGET
+app.config['SHEET_PARSE_WORKERS'] = int(os.environ.get('EXCEL_TOOLKIT_SHEET_PARSE_WORKERS', '1'))
+app.config['SHEET_PARSE_MIN_BYTES'] = 16 * 1024 * 1024  # sheet XML解压后的总大小超过该值才并行解析
+app.config['PROFILE_CHUNK_ROWS'] = 50000  # 列概况统计每次读取的行数
+app.config['SPLIT_CONFIRM_PARTS'] = 200  # 按列拆分预计生成的文件数超过该值时需要用户确认
+app.config['SPLIT_MAX_PARTS'] = 5000  # 按列拆分预计生成的文件数超过该值时拒绝
+app.config['MERGE_MASTER_DIR'] = os.path.join(tempfile.gettempdir(), 'excel_toolkit_merge_masters')
+app.config['MERGE_MASTER_TTL'] = 90 * 24 * 60 * 60  # 增量合并的主表保留90天（每次读取或更新后重新计时）
+
+# 已清理过遗留上传临时文件的进程PID
+_stale_sweep_pid = None
+
+def sweep_stale_uploads():
+    """
+    每个进程第一次接收上传文件时，清理崩溃进程遗留的上传临时文件
+    预加载模式下worker由主进程fork出来，不会重新导入本模块，所以不能只在导入时清理
+    """
+    global _stale_sweep_pid
+    if _stale_sweep_pid != os.getpid():
+        _stale_sweep_pid = os.getpid()
+        cleanup_stale_files(app.config['UPLOAD_TEMP_DIR'])
 
 # 允许的文件扩展名
 ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
@@ -26,12 +124,9 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def create_temp_excel(dataframe, filename=None):
-    """创建临时的Excel文件并返回字节流"""
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        dataframe.to_excel(writer, sheet_name='Sheet1', index=False)
-    output.seek(0)
-    return output
+    """创建临时的Excel文件并返回字节流，超出单个sheet的行数上限时续写到Sheet2、Sheet3…"""
+    parts = split_rows(dataframe, app.config['EXCEL_MAX_ROWS'])
+    return create_temp_workbook([(f'Sheet{i + 1}', part) for i, part in enumerate(parts)])
 
 def create_temp_csv(dataframe, filename=None):
     """创建临时的CSV文件并返回字节流"""
@@ -40,6 +135,20 @@ def create_temp_csv(dataframe, filename=None):
     output.seek(0)
     return output
 
+def create_temp_workbook(sheet_frames):
+    """
+    创建包含多个sheet的临时Excel文件并返回字节流，sheet_frames为(sheet名, DataFrame)列表
+    超出行数上限的sheet续写到"<sheet名>_2"、"<sheet名>_3"…
+    """
+    output = io.BytesIO()
+    write_workbook(output, [
+        (sheet_name if i == 0 else f'{sheet_name[:28]}_{i + 1}', part)
+        for sheet_name, df in sheet_frames
+        for i, part in enumerate(split_rows(df, app.config['EXCEL_MAX_ROWS']))
+    ])
+    output.seek(0)
+    return output
+
 def create_zip_file(files_dict):
     """创建包含多个文件的ZIP压缩包"""
     zip_buffer = io.BytesIO()
@@ -49,83 +158,615 @@ def create_zip_file(files_dict):
     zip_buffer.seek(0)
     return zip_buffer
 
+def get_result_store():
+    """获取（必要时创建）结果存储"""
+    store = app.extensions.get('result_store')
+    if store is None:
+        store = ResultStore(
+            app.config['RESULT_STORE_DIR'],
+            app.config['RESULT_STORE_MAX_BYTES'],
+            app.config['RESULT_STORE_TTL'],
+        )
+        app.extensions['result_store'] = store
+    return store
+
+def get_upload_store():
+    """获取（必要时创建）分块上传存储"""
+    store = app.extensions.get('upload_store')
+    if store is None:
+        store = UploadStore(
+            app.config['UPLOAD_STORE_DIR'],
+            app.config['UPLOAD_CHUNK_SIZE'],
+            app.config['UPLOAD_MAX_FILE_SIZE'],
+            app.config['UPLOAD_STORE_TTL'],
+            app.config['UPLOAD_STORE_MAX_BYTES'],
+            app.config['UPLOAD_MAX_SESSIONS'],
+        )
+        app.extensions['upload_store'] = store
+    return store
+
+def get_master_store():
+    """获取（必要时创建）增量合并的主表存储"""
+    store = app.extensions.get('master_store')
+    if store is None:
+        store = MasterStore(app.config['MERGE_MASTER_DIR'], app.config['MERGE_MASTER_TTL'])
+        app.extensions['master_store'] = store
+    return store
+
+class StoredUpload(FileStorage):
+    """通过分块上传保存在服务器上的文件，path为数据文件路径"""
+
+    def __init__(self, path, filename):
+        super().__init__(filename=filename)
+        self.path = path
+
+def request_files(field):
+    """
+    获取请求中的文件列表：直接上传的文件，加上分块上传后通过ID引用的文件
+    多文件字段files对应upload_ids/upload_names，单文件字段file对应upload_id/upload_name
+    两者都没有时返回None，引用的文件不存在时抛出UploadError
+    """
+    id_field, name_field = ('upload_ids', 'upload_names') if field == 'files' else ('upload_id', 'upload_name')
+    upload_ids = request.form.getlist(id_field)
+    upload_names = request.form.getlist(name_field)
+    if field not in request.files and not upload_ids:
+        return None
+
+    files = request.files.getlist(field)
+    for index, upload_id in enumerate(upload_ids):
+        meta = get_upload_store().get(upload_id)
+        if meta is None:
+            raise UploadError('上传的文件不存在或已过期，请重新上传')
+        filename = upload_names[index] if index < len(upload_names) and upload_names[index] else meta['filename']
+        files.append(StoredUpload(meta['path'], filename))
+    return files
+
+def request_upload_bytes():
+    """本次请求涉及的数据量：请求体大小加上引用的分块上传文件大小"""
+    total = request.content_length or 0
+    for upload_id in request.form.getlist('upload_ids') + request.form.getlist('upload_id'):
+        meta = get_upload_store().get(upload_id)
+        if meta is not None:
+            total += meta['size']
+    return total
+
+def input_handle_key(file):
+    """
+    InputHandle缓存的键
+    分块上传的文件每次调用request_files()都会创建新的StoredUpload对象，按数据文件路径和文件名区分；
+    直接上传的文件对象在整个请求期间由request.files持有，id不会被复用
+    """
+    if isinstance(file, StoredUpload):
+        return ('stored', file.path, file.filename)
+    return ('upload', id(file))
+
+def get_input_handle(file):
+    """获取上传文件的InputHandle，同一请求内对同一文件只创建一次，请求结束时自动删除"""
+    handles = g.setdefault('input_handles', {})
+    key = input_handle_key(file)
+    handle = handles.get(key)
+    if handle is None:
+        if isinstance(file, StoredUpload):
+            # 分块上传的文件由上传存储管理，请求结束时不删除
+            handle = InputHandle(file.path, file.filename, delete=False)
+        else:
+            handle = InputHandle.from_upload(file, app.config['UPLOAD_TEMP_DIR'])
+        handles[key] = handle
+    return handle
+
+@app.teardown_request
+def close_input_handles(exc=None):
+    """请求结束（包括出错）时删除本次请求的上传临时文件"""
+    for handle in g.pop('input_handles', {}).values():
+        handle.close()
+
+    # 没有被InputHandle接管的上传文件（例如被跳过的文件）
+    for stream in request.__dict__.get('upload_temp_files', []):
+        stream.close()
+        try:
+            os.unlink(stream.name)
+        except OSError:
+            pass
+
+# 参与生成结果的模块和库，部署新版本后已保存的结果不再使用
+RESULT_CODE_MODULES = ('csv_reader', 'xlsx_stream', 'xlsx_inplace', 'parallel_sheets')
+RESULT_LIBRARIES = ('pandas', 'openpyxl', 'pyarrow')
+
+# 影响处理结果的配置项
+RESULT_CONFIG_KEYS = ('EXCEL_MAX_ROWS',)
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """本模块及参与生成结果的模块的代码哈希，加上所用库的版本"""
+    digest = hashlib.sha256()
+    paths = [__file__] + [importlib.import_module(name).__file__ for name in RESULT_CODE_MODULES]
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    for name in RESULT_LIBRARIES:
+        try:
+            digest.update(f'{name}=={importlib.metadata.version(name)}'.encode('utf-8'))
+        except importlib.metadata.PackageNotFoundError:
+            pass
+    return digest.hexdigest()
+
+def result_version():
+    """结果ID中的版本：代码版本和影响结果的配置"""
+    config = {key: app.config[key] for key in RESULT_CONFIG_KEYS}
+    return f"{code_version()}:{json.dumps(config, sort_keys=True)}"
+
+def request_result_id(operation):
+    """根据当前请求的操作、表单参数、上传文件内容和代码/配置版本计算结果ID"""
+    params = {key: request.form.getlist(key) for key in request.form}
+    input_hashes = [
+        [field, file.filename, get_input_handle(file).sha256]
+        for field in request.files
+        for file in request.files.getlist(field)
+    ]
+    return compute_result_id(operation, params, input_hashes, result_version())
+
+def send_stored_result(meta):
+    """从结果存储发送文件，支持ETag和Range断点续传"""
+    response = send_file(
+        meta['path'],
+        as_attachment=True,
+        download_name=meta['download_name'],
+        mimetype=meta['mimetype'],
+        conditional=True,
+        etag=meta['etag'],
+    )
+    response.headers['X-Result-Id'] = meta['id']
+    return response
+
+def send_result(output, download_name, mimetype):
+    """保存处理结果到结果存储并发送，无法保存时直接从内存发送"""
+    result_id = g.get('result_id')
+    meta = get_result_store().put(result_id, output, download_name, mimetype) if result_id else None
+    if meta is None:
+        return send_file(output, as_attachment=True, download_name=download_name, mimetype=mimetype)
+    return send_stored_result(meta)
+
+def send_excel_result(dataframe, base_name):
+    """
+    发送单个DataFrame的Excel结果
+    超出单个sheet的行数上限时，默认续写到多个sheet；表单参数rollover=files时改为拆分成多个文件打包为ZIP
+    """
+    parts = split_rows(dataframe, app.config['EXCEL_MAX_ROWS'])
+    if len(parts) > 1 and request.form.get('rollover') == 'files':
+        files_dict = {f"{base_name}_第{i+1}部分.xlsx": create_temp_excel(part) for i, part in enumerate(parts)}
+        return send_result(create_zip_file(files_dict), f"{base_name}.zip", 'application/zip')
+    return send_result(create_temp_excel(dataframe), f"{base_name}.xlsx",
+                       'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+def stored_result(operation):
+    """
+    路由装饰器：相同的输入文件和参数直接返回已保存的结果，不再重新计算
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            g.result_id = request_result_id(operation)
+            meta = get_result_store().get(g.result_id)
+            if meta is not None:
+                return send_stored_result(meta)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def get_admission_controller():
+    """获取（必要时创建）本进程的准入控制器，内存预算为总预算按服务进程数平分后的份额"""
+    controller = app.extensions.get('admission')
+    if controller is None:
+        controller = AdmissionController(
+            app.config['ADMISSION_MEMORY_BUDGET'] // max(app.config['SERVER_WORKERS'], 1),
+            app.config['ADMISSION_CONCURRENCY'],
+            default_concurrency=app.config['ADMISSION_DEFAULT_CONCURRENCY'],
+            queue_timeout=app.config['ADMISSION_QUEUE_TIMEOUT'],
+            max_queue_depth=app.config['ADMISSION_MAX_QUEUE_DEPTH'],
+        )
+        app.extensions['admission'] = controller
+    return controller
+
+def admission_controlled(operation):
+    """
+    路由装饰器：按上传大小估算内存占用，超出内存预算或并发上限时排队，排队失败返回503
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            controller = get_admission_controller()
+            cost = controller.estimate_cost(operation, request_upload_bytes())
+            try:
+                with controller.admit(operation, cost):
+                    return view(*args, **kwargs)
+            except AdmissionRejected as e:
+                response = jsonify({'error': '服务器繁忙，请稍后重试', 'retry_after': e.retry_after})
+                response.status_code = 503
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+        return wrapper
+    return decorator
+
+# 同一时间只分析一个请求，避免多个分析器互相干扰
+_profiling_lock = threading.Lock()
+
+# Python 3.12起cProfile基于sys.monitoring，对解释器中的所有线程生效：
+# 多线程服务器上，分析结果中会包含同一时间在其他线程中处理的请求
+PROFILE_ALL_THREADS = sys.version_info >= (3, 12)
+
+def get_profile_store():
+    """获取（必要时创建）性能分析结果存储"""
+    store = app.extensions.get('profile_store')
+    if store is None:
+        store = ProfileStore(app.config['PROFILE_DIR'], app.config['PROFILE_MAX_COUNT'])
+        app.extensions['profile_store'] = store
+    return store
+
+def has_admin_token():
+    """检查请求是否携带有效的管理令牌（只接受请求头 X-Admin-Token，查询参数会出现在访问日志和浏览器历史中）"""
+    token = app.config['ADMIN_TOKEN']
+    provided = request.headers.get('X-Admin-Token', '')
+    return bool(token) and hmac.compare_digest(provided, token)
+
+def should_profile():
+    """当前请求是否需要性能分析：管理员通过 X-Profile: 1 请求分析，或按比例采样命中"""
+    if request.headers.get('X-Profile') == '1' and has_admin_token():
+        return True
+    rate = app.config['PROFILING_SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
+
+def note_rows_read(count):
+    """性能分析开启时记录本次请求读取的数据行数"""
+    if has_request_context() and 'profile_meta' in g:
+        g.profile_meta['rows_read'] += count
+
+def profile_inputs():
+    """性能分析元数据中的输入文件名和大小"""
+    try:
+        files = (request_files('files') or []) + (request_files('file') or [])
+    except UploadError:
+        return []
+    return [{'filename': file.filename, 'size': get_input_handle(file).size} for file in files]
+
+def profiled(operation):
+    """
+    路由装饰器：对被选中的请求进行cProfile分析，结果连同请求元数据一起保存
+    未开启时只有一次配置检查的开销
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not should_profile() or not _profiling_lock.acquire(blocking=False):
+                return view(*args, **kwargs)
+
+            g.profile_meta = {'rows_read': 0}
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            try:
+                response = app.make_response(profiler.runcall(view, *args, **kwargs))
+            finally:
+                duration = time.perf_counter() - start
+                _profiling_lock.release()
+
+            meta = {
+                'operation': operation,
+                'path': request.path,
+                'status_code': response.status_code,
+                'duration': round(duration, 4),
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'inputs': profile_inputs(),
+                'rows_read': g.profile_meta['rows_read'],
+                'form': {key: request.form.get(key) for key in request.form},
+                'thread': threading.current_thread().name,
+                'python': platform.python_version(),
+                'all_threads': PROFILE_ALL_THREADS,
+            }
+            profile_id = get_profile_store().save(profiler, meta)
+            # 采样命中的普通请求不返回结果ID，只有管理员才能看到
+            if has_admin_token():
+                response.headers['X-Profile-Id'] = profile_id
+            return response
+        return wrapper
+    return decorator
+
+# 筛选条件映射
+FILTER_CONDITIONS = {
+    '等于': lambda df, col, val: df[col] == val,
+    '不等于': lambda df, col, val: df[col] != val,
+    '包含': lambda df, col, val: df[col].astype(str).str.contains(val, na=False),
+    '不包含': lambda df, col, val: ~df[col].astype(str).str.contains(val, na=False),
+    '大于': lambda df, col, val: pd.to_numeric(df[col], errors='coerce') > pd.to_numeric(val, errors='coerce'),
+    '小于': lambda df, col, val: pd.to_numeric(df[col], errors='coerce') < pd.to_numeric(val, errors='coerce'),
+    '大于等于': lambda df, col, val: pd.to_numeric(df[col], errors='coerce') >= pd.to_numeric(val, errors='coerce'),
+    '小于等于': lambda df, col, val: pd.to_numeric(df[col], errors='coerce') <= pd.to_numeric(val, errors='coerce'),
+}
+
+def read_dataframe(source, filename=None, engine='openpyxl'):
+    """读取CSV或Excel文件为DataFrame，source可以是InputHandle、路径或文件对象"""
+    filename = filename or source.filename
+    if isinstance(source, InputHandle):
+        source = source.path
+    if filename.endswith('.csv'):
+        df = read_csv_file(source)
+    else:
+        df = pd.read_excel(source, engine=engine)
+    note_rows_read(len(df))
+    return df
+
+def count_input_rows(handle, all_sheets=False):
+    """
+    不解析单元格，快速统计文件的数据行数（不含表头）
+    all_sheets为False时只统计第一个sheet（与read_dataframe一致）；无法快速统计的格式（.xls）返回None
+    """
+    filename = handle.filename.lower()
+    if filename.endswith('.csv'):
+        return count_csv_rows(handle.path)
+    if not filename.endswith('.xlsx'):
+        return None
+    with handle.zip_view() as zip_file:
+        sheets = workbook_sheets(zip_file)
+        if not all_sheets:
+            sheets = sheets[:1]
+        return sum(max(count_sheet_rows(zip_file, part) - 1, 0) for _, part in sheets)
+
+def iter_dataframe_chunks(handle, chunk_rows):
+    """
+    按块读取文件（只读第一个sheet，与read_dataframe一致），每次返回最多chunk_rows行的DataFrame
+    csv和xlsx流式读取，内存占用与行数无关；.xls整体读取后再分块
+    """
+    filename = handle.filename.lower()
+    if filename.endswith('.csv'):
+        chunks = iter_csv_chunks(handle.path, chunk_rows)
+    elif filename.endswith('.xlsx'):
+        chunks = iter_sheet_chunks(handle.path, chunk_rows)
+    else:
+        df = read_dataframe(handle, engine=None)
+        chunks = (df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows))
+    for chunk in chunks:
+        note_rows_read(len(chunk))
+        yield chunk
+
+_sheet_pool_lock = threading.Lock()
+
+def get_sheet_pool():
+    """获取（必要时创建）并行解析sheet的进程池，使用spawn方式启动，避免在多线程的服务进程中fork"""
+    pool = app.extensions.get('sheet_pool')
+    if pool is None:
+        with _sheet_pool_lock:
+            pool = app.extensions.get('sheet_pool')
+            if pool is None:
+                pool = ProcessPoolExecutor(
+                    max_workers=app.config['SHEET_PARSE_WORKERS'],
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+                app.extensions['sheet_pool'] = pool
+    return pool
+
+def read_sheets_in_parallel(path):
+    """
+    sheet较多且较大的xlsx：各sheet分给多个进程并行解析，返回(sheet名, DataFrame)列表
+    不适合并行（未开启、不是xlsx、只有一个sheet或文件较小）时返回None
+    """
+    workers = app.config['SHEET_PARSE_WORKERS']
+    if workers <= 1 or not zipfile.is_zipfile(path):
+        return None
+    sheets = sheet_sizes(path)
+    if len(sheets) < 2 or sum(size for _, size in sheets) < app.config['SHEET_PARSE_MIN_BYTES']:
+        return None
+    return read_sheets_parallel(get_sheet_pool(), path, sheets, workers)
+
+def read_excel_sheets(source, engine='openpyxl', parallel=False):
+    """
+    按原顺序读取Excel文件的所有sheet（文件只打开一次），返回(sheet名, DataFrame)列表
+    parallel为True时，较大的xlsx由多个进程分别解析各自的sheet
+    """
+    if isinstance(source, InputHandle):
+        source = source.path
+    sheet_frames = None
+    if parallel and engine == 'openpyxl' and isinstance(source, str):
+        sheet_frames = read_sheets_in_parallel(source)
+    if sheet_frames is None:
+        with pd.ExcelFile(source, engine=engine) as excel_file:
+            sheet_frames = [(sheet_name, excel_file.parse(sheet_name)) for sheet_name in excel_file.sheet_names]
+    note_rows_read(sum(len(df) for _, df in sheet_frames))
+    return sheet_frames
+
+def merge_sheet_frames(sheet_frames, add_sheet_column=False):
+    """
+    合并同一文件的多个sheet
+    跳过第一个sheet之后每个sheet的第一行数据，与合并多个文件的标题行处理一致
+    """
+    all_data = []
+
+    for index, (sheet_name, df) in enumerate(sheet_frames):
+        # 添加来源Sheet列
+        if add_sheet_column:
+            df = df.copy()
+            df['来源Sheet'] = sheet_name
+
+        # 跳过第一个sheet的标题行，保留其他sheet的标题行
+        if index > 0:
+            df = df.iloc[1:] if len(df) > 0 else df
+
+        all_data.append(df)
+
+    return pd.concat(all_data, ignore_index=True)
+
+def safe_name(value):
+    """将任意值转换为可用作文件名的字符串"""
+    return str(value).replace('/', '_').replace('\\', '_')
+
+def parse_column_list(columns):
+    """解析逗号分隔的列名字符串（或列名列表），移除空白项"""
+    if isinstance(columns, str):
+        columns = columns.split(',')
+    return [str(col).strip() for col in columns if str(col).strip()]
+
+def merge_dataframes(named_frames, keep_headers=True, add_source_column=False, base=None):
+    """
+    纵向合并多个DataFrame
+    named_frames为(来源名称, DataFrame)列表，返回合并后的DataFrame
+    base为之前合并的结果（增量合并）时，named_frames追加在其后，结果与全部文件一起合并相同
+    """
+    all_data = [] if base is None else [base]
+    header_saved = base is not None
+
+    for source_name, df in named_frames:
+        # 添加来源文件列
+        if add_source_column:
+            df = df.copy()
+            df['来源文件'] = source_name
+
+        # 处理标题行
+        if not header_saved and keep_headers:
+            all_data.append(df)
+            header_saved = True
+        elif header_saved and keep_headers:
+            all_data.append(df.iloc[1:])  # 跳过标题行
+        else:
+            all_data.append(df)
+
+    return pd.concat(all_data, ignore_index=True)
+
+def filter_dataframe(df, column_name, condition, value):
+    """按筛选条件过滤DataFrame，条件必须是FILTER_CONDITIONS中的键"""
+    mask = FILTER_CONDITIONS[condition](df, column_name, value)
+    return df[mask]
+
+def filter_named_frames(named_frames, column_name, condition, value):
+    """
+    按条件筛选多个(来源名称, DataFrame)，添加来源文件列后合并为一个DataFrame
+    不含该列或筛选失败的数据表被跳过，没有任何匹配数据时返回None
+    """
+    all_filtered_data = []
+    for source_name, df in named_frames:
+        if column_name not in df.columns:
+            continue
+
+        # 添加来源文件列（已有该列时保留原来的来源，例如先合并再筛选）
+        if '来源文件' not in df.columns:
+            df = df.assign(来源文件=source_name)
+
+        try:
+            filtered_df = filter_dataframe(df, column_name, condition, value)
+        except Exception:
+            # 如果筛选失败，跳过这个文件
+            continue
+        if not filtered_df.empty:
+            all_filtered_data.append(filtered_df)
+
+    if not all_filtered_data:
+        return None
+    return pd.concat(all_filtered_data, ignore_index=True)
+
+def drop_columns(df, columns):
+    """删除DataFrame中的指定列（只删除存在的列）"""
+    existing_columns = [col for col in columns if col in df.columns]
+    if existing_columns:
+        df = df.drop(columns=existing_columns)
+    return df
+
+def replace_values(df, find_text, replace_text):
+    """在DataFrame中执行查找替换（整个单元格匹配）"""
+    return df.replace(find_text, replace_text, regex=False)
+
+def split_dataframe_by_column(df, column_name):
+    """按列的唯一值拆分DataFrame，返回(值, DataFrame)列表"""
+    return [(value, df[df[column_name] == value]) for value in df[column_name].unique()]
+
+def split_dataframe_by_rows(df, rows_per_file):
+    """按行数拆分DataFrame，返回DataFrame列表"""
+    total_rows = len(df)
+    num_files = (total_rows + rows_per_file - 1) // rows_per_file
+    return [df.iloc[i * rows_per_file:min((i + 1) * rows_per_file, total_rows)] for i in range(num_files)]
+
 @app.route('/')
 def index():
     """主页"""
     return render_template('index.html')
 
 @app.route('/api/merge-files', methods=['POST'])
+@profiled('merge_files')
+@stored_result('merge_files')
+@admission_controlled('merge_files')
 def merge_files():
     """
     合并多个Excel文件
     """
     try:
-        if 'files' not in request.files:
+        files = request_files('files')
+        if files is None:
             return jsonify({'error': '没有上传文件'}), 400
 
-        files = request.files.getlist('files')
         if not files or files[0].filename == '':
             return jsonify({'error': '请选择文件'}), 400
 
         keep_headers = request.form.get('keep_headers', 'true').lower() == 'true'
         add_source_column = request.form.get('add_source_column', 'false').lower() == 'true'
+        incremental = request.form.get('incremental', 'false').lower() == 'true'
 
-        all_data = []
-        header_saved = False
-
-        for file in files:
-            if not allowed_file(file.filename):
-                continue
+        output_format = request.form.get('output_format', 'xlsx').strip().lower()
+        if output_format not in ('xlsx', 'csv'):
+            return jsonify({'error': '输出格式只支持xlsx或csv'}), 400
 
-            # 读取Excel文件
-            if file.filename.endswith('.csv'):
-                df = pd.read_csv(file, encoding='utf-8-sig')
-            else:
-                df = pd.read_excel(file, engine='openpyxl')
-
-            # 添加来源文件列
-            if add_source_column:
-                df['来源文件'] = file.filename
-
-            # 处理标题行
-            if not header_saved and keep_headers:
-                all_data.append(df)
-                header_saved = True
-            elif header_saved and keep_headers:
-                all_data.append(df.iloc[1:])  # 跳过标题行
-            else:
-                all_data.append(df)
-
-        if not all_data:
+        valid_files = [file for file in files if allowed_file(file.filename)]
+        if not valid_files:
             return jsonify({'error': '没有有效的Excel文件'}), 400
 
-        # 合并所有数据
-        merged_df = pd.concat(all_data, ignore_index=True)
-
-        # 创建输出文件
-        output = create_temp_excel(merged_df)
-        filename = f"合并结果_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        # 增量合并：之前合并过的文件（按顺序、文件名和内容都相同）直接使用保存的主表，只解析新增的文件
+        # 主表按名称区分，必须填写名称，否则所有用户会共用并互相覆盖同一个主表
+        master_name = request.form.get('master', '').strip()
+        if incremental and not master_name:
+            return jsonify({'error': '增量合并需要填写合并任务名称'}), 400
+
+        base_df = None
+        if incremental:
+            master_key = compute_master_key(
+                master_name,
+                {'keep_headers': keep_headers, 'add_source_column': add_source_column},
+            )
+            inputs = [[file.filename, get_input_handle(file).sha256] for file in valid_files]
+            master = get_master_store().load(master_key)
+            if master is not None and 0 < len(master[1]) <= len(inputs) and inputs[:len(master[1])] == master[1]:
+                base_df = master[0]
+                valid_files = valid_files[len(master[1]):]
 
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        # 读取Excel文件
+        named_frames = [(file.filename, read_dataframe(get_input_handle(file))) for file in valid_files]
 
+        # 合并所有数据
+        if base_df is not None and not named_frames:
+            merged_df = base_df
+        else:
+            merged_df = merge_dataframes(named_frames, keep_headers, add_source_column, base=base_df)
+            if incremental:
+                get_master_store().save(master_key, merged_df, inputs)
+
+        # 创建输出文件（xlsx超出行数上限时自动拆分）
+        base_name = f"合并结果_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        if output_format == 'csv':
+            return send_result(create_temp_csv(merged_df), f"{base_name}.csv", 'text/csv')
+        return send_excel_result(merged_df, base_name)
+
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'处理文件时出错: {str(e)}'}), 500
 
 @app.route('/api/merge-sheets', methods=['POST'])
+@profiled('merge_sheets')
+@stored_result('merge_sheets')
+@admission_controlled('merge_sheets')
 def merge_sheets():
     """
     合并单个文件的多个Sheet
     """
     try:
-        if 'file' not in request.files:
+        files = request_files('file')
+        if not files:
             return jsonify({'error': '没有上传文件'}), 400
 
-        file = request.files['file']
+        file = files[0]
         if file.filename == '':
             return jsonify({'error': '请选择文件'}), 400
 
@@ -134,59 +775,34 @@ def merge_sheets():
 
         add_sheet_column = request.form.get('add_sheet_column', 'false').lower() == 'true'
 
-        # 读取所有sheet
-        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-            file.save(tmp_file.name)
-            tmp_file_path = tmp_file.name
-
-        try:
-            excel_file = pd.ExcelFile(tmp_file_path)
-            all_data = []
-
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(tmp_file_path, sheet_name=sheet_name, engine='openpyxl')
-
-                # 添加来源Sheet列
-                if add_sheet_column:
-                    df['来源Sheet'] = sheet_name
-
-                # 跳过第一个sheet的标题行，保留其他sheet的标题行
-                if excel_file.sheet_names.index(sheet_name) > 0:
-                    df = df.iloc[1:] if len(df) > 0 else df
+        # 读取所有sheet（较大的文件多进程并行解析）
+        sheet_frames = read_excel_sheets(get_input_handle(file), parallel=True)
 
-                all_data.append(df)
-
-            # 合并所有数据
-            merged_df = pd.concat(all_data, ignore_index=True)
-
-            # 创建输出文件
-            output = create_temp_excel(merged_df)
-            filename = f"合并Sheet结果_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-
-            return send_file(
-                output,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
+        # 合并所有数据
+        merged_df = merge_sheet_frames(sheet_frames, add_sheet_column)
 
-        finally:
-            # 删除临时文件
-            os.unlink(tmp_file_path)
+        # 创建输出文件（超出行数上限时自动拆分）
+        return send_excel_result(merged_df, f"合并Sheet结果_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
 
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'处理文件时出错: {str(e)}'}), 500
 
 @app.route('/api/split-by-column', methods=['POST'])
+@profiled('split_by_column')
+@stored_result('split_by_column')
+@admission_controlled('split_by_column')
 def split_by_column():
     """
     按列拆分Sheet
     """
     try:
-        if 'file' not in request.files:
+        files = request_files('file')
+        if not files:
             return jsonify({'error': '没有上传文件'}), 400
 
-        file = request.files['file']
+        file = files[0]
         column_name = request.form.get('column_name', '').strip()
 
         if file.filename == '':
@@ -199,54 +815,59 @@ def split_by_column():
             return jsonify({'error': '只支持Excel文件'}), 400
 
         # 读取文件
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(file, encoding='utf-8-sig')
-        else:
-            df = pd.read_excel(file, engine='openpyxl')
+        df = read_dataframe(get_input_handle(file))
 
         # 检查列是否存在
         if column_name not in df.columns:
             return jsonify({'error': f'列名 "{column_name}" 不存在'}), 400
 
+        # 预估拆分出的文件数，过多时拒绝，较多时需要用户确认后再生成
+        parts = estimate_distinct(df[column_name])
+        if parts > app.config['SPLIT_MAX_PARTS']:
+            return jsonify({'error': f'列 "{column_name}" 约有 {parts} 个不同的值，'
+                                     f'超过单次拆分的上限（{app.config["SPLIT_MAX_PARTS"]} 个文件）'}), 400
+        if parts > app.config['SPLIT_CONFIRM_PARTS'] and request.form.get('confirm', 'false').lower() != 'true':
+            return jsonify({
+                'error': f'按列 "{column_name}" 拆分将生成约 {parts} 个文件',
+                'confirm_required': True,
+                'parts': parts,
+            }), 409
+
         # 按列的唯一值拆分
-        unique_values = df[column_name].unique()
         files_dict = {}
 
-        for value in unique_values:
-            # 过滤数据
-            filtered_df = df[df[column_name] == value]
-
+        for value, filtered_df in split_dataframe_by_column(df, column_name):
             # 创建文件
             output = create_temp_excel(filtered_df)
             # 安全文件名
-            safe_value = str(value).replace('/', '_').replace('\\', '_')
-            filename = f"{safe_value}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+            filename = f"{safe_name(value)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
             files_dict[filename] = output
 
         # 创建ZIP文件
         zip_buffer = create_zip_file(files_dict)
         zip_filename = f"按列拆分结果_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
 
-        return send_file(
-            zip_buffer,
-            as_attachment=True,
-            download_name=zip_filename,
-            mimetype='application/zip'
-        )
+        return send_result(zip_buffer, zip_filename, 'application/zip')
 
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'处理文件时出错: {str(e)}'}), 500
 
 @app.route('/api/split-by-rows', methods=['POST'])
+@profiled('split_by_rows')
+@stored_result('split_by_rows')
+@admission_controlled('split_by_rows')
 def split_by_rows():
     """
     按行数拆分Sheet
     """
     try:
-        if 'file' not in request.files:
+        files = request_files('file')
+        if not files:
             return jsonify({'error': '没有上传文件'}), 400
 
-        file = request.files['file']
+        file = files[0]
         rows_per_file = request.form.get('rows_per_file', '').strip()
 
         if file.filename == '':
@@ -266,23 +887,12 @@ def split_by_rows():
             return jsonify({'error': '只支持Excel文件'}), 400
 
         # 读取文件
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(file, encoding='utf-8-sig')
-        else:
-            df = pd.read_excel(file, engine='openpyxl')
+        df = read_dataframe(get_input_handle(file))
 
         # 按行数拆分
-        total_rows = len(df)
-        num_files = (total_rows + rows_per_file - 1) // rows_per_file
         files_dict = {}
 
-        for i in range(num_files):
-            start_idx = i * rows_per_file
-            end_idx = min((i + 1) * rows_per_file, total_rows)
-
-            # 切片数据
-            split_df = df.iloc[start_idx:end_idx]
-
+        for i, split_df in enumerate(split_dataframe_by_rows(df, rows_per_file)):
             # 创建文件
             output = create_temp_excel(split_df)
             filename = f"第{i+1}部分_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
@@ -292,28 +902,30 @@ def split_by_rows():
         zip_buffer = create_zip_file(files_dict)
         zip_filename = f"按行拆分结果_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
 
-        return send_file(
-            zip_buffer,
-            as_attachment=True,
-            download_name=zip_filename,
-            mimetype='application/zip'
-        )
+        return send_result(zip_buffer, zip_filename, 'application/zip')
 
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'处理文件时出错: {str(e)}'}), 500
 
 @app.route('/api/find-replace', methods=['POST'])
+@profiled('find_replace')
+@stored_result('find_replace')
+@admission_controlled('find_replace')
 def find_replace():
     """
     批量查找与替换
+    engine=pandas（默认）通过DataFrame处理；engine=inplace直接修改xlsx的XML，保留原有格式
     """
     try:
-        if 'files' not in request.files:
+        files = request_files('files')
+        if files is None:
             return jsonify({'error': '没有上传文件'}), 400
 
-        files = request.files.getlist('files')
         find_text = request.form.get('find_text', '').strip()
         replace_text = request.form.get('replace_text', '').strip()
+        engine = request.form.get('engine', 'pandas').strip().lower()
 
         if not files or files[0].filename == '':
             return jsonify({'error': '请选择文件'}), 400
@@ -321,6 +933,9 @@ def find_replace():
         if not find_text:
             return jsonify({'error': '请输入查找内容'}), 400
 
+        if engine not in ('pandas', 'inplace'):
+            return jsonify({'error': '无效的替换引擎'}), 400
+
         files_dict = {}
 
         for file in files:
@@ -329,43 +944,38 @@ def find_replace():
 
             # 读取Excel文件的所有sheet
             if file.filename.endswith('.csv'):
-                df = pd.read_csv(file, encoding='utf-8-sig')
+                df = read_dataframe(get_input_handle(file))
                 # 执行查找替换
-                df = df.replace(find_text, replace_text, regex=False)
+                df = replace_values(df, find_text, replace_text)
 
                 # 创建输出文件
                 output = create_temp_csv(df)
                 filename = f"替换_{secure_filename(file.filename)}"
                 files_dict[filename] = output
-            else:
-                # 处理Excel文件
-                with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-                    file.save(tmp_file.name)
-                    tmp_file_path = tmp_file.name
-
+            elif engine == 'inplace' and file.filename.endswith('.xlsx'):
+                # 直接修改共享字符串表和单元格XML，保留格式
+                output = io.BytesIO()
                 try:
-                    excel_file = pd.ExcelFile(tmp_file_path)
-                    sheet_data = {}
+                    with get_input_handle(file).zip_view() as source_zip:
+                        replace_in_workbook(source_zip, output, find_text, replace_text)
+                except zipfile.BadZipFile:
+                    return jsonify({'error': f'文件 "{file.filename}" 不是有效的xlsx文件'}), 400
+                output.seek(0)
 
-                    for sheet_name in excel_file.sheet_names:
-                        df = pd.read_excel(tmp_file_path, sheet_name=sheet_name, engine='openpyxl')
-                        # 执行查找替换
-                        df = df.replace(find_text, replace_text, regex=False)
-                        sheet_data[sheet_name] = df
-
-                    # 创建新的Excel文件
-                    output = io.BytesIO()
-                    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                        for sheet_name, df in sheet_data.items():
-                            df.to_excel(writer, sheet_name=sheet_name, index=False)
-                    output.seek(0)
+                filename = f"替换_{secure_filename(file.filename)}"
+                files_dict[filename] = output
+            else:
+                # 处理Excel文件，对每个sheet执行查找替换
+                sheet_frames = [
+                    (sheet_name, replace_values(df, find_text, replace_text))
+                    for sheet_name, df in read_excel_sheets(get_input_handle(file))
+                ]
 
-                    filename = f"替换_{secure_filename(file.filename)}"
-                    files_dict[filename] = output
+                # 创建新的Excel文件
+                output = create_temp_workbook(sheet_frames)
 
-                finally:
-                    # 删除临时文件
-                    os.unlink(tmp_file_path)
+                filename = f"替换_{secure_filename(file.filename)}"
+                files_dict[filename] = output
 
         if not files_dict:
             return jsonify({'error': '没有有效的文件'}), 400
@@ -374,26 +984,26 @@ def find_replace():
         zip_buffer = create_zip_file(files_dict)
         zip_filename = f"查找替换结果_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
 
-        return send_file(
-            zip_buffer,
-            as_attachment=True,
-            download_name=zip_filename,
-            mimetype='application/zip'
-        )
+        return send_result(zip_buffer, zip_filename, 'application/zip')
 
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'处理文件时出错: {str(e)}'}), 500
 
 @app.route('/api/delete-columns', methods=['POST'])
+@profiled('delete_columns')
+@stored_result('delete_columns')
+@admission_controlled('delete_columns')
 def delete_columns():
     """
     批量删除指定列
     """
     try:
-        if 'files' not in request.files:
+        files = request_files('files')
+        if files is None:
             return jsonify({'error': '没有上传文件'}), 400
 
-        files = request.files.getlist('files')
         columns_text = request.form.get('columns', '').strip()
 
         if not files or files[0].filename == '':
@@ -403,8 +1013,7 @@ def delete_columns():
             return jsonify({'error': '请输入要删除的列名'}), 400
 
         # 解析列名
-        columns_to_delete = [col.strip() for col in columns_text.split(',')]
-        columns_to_delete = [col for col in columns_to_delete if col]  # 移除空字符串
+        columns_to_delete = parse_column_list(columns_text)
 
         if not columns_to_delete:
             return jsonify({'error': '请输入有效的列名'}), 400
@@ -416,15 +1025,10 @@ def delete_columns():
                 continue
 
             # 读取文件
-            if file.filename.endswith('.csv'):
-                df = pd.read_csv(file, encoding='utf-8-sig')
-            else:
-                df = pd.read_excel(file)
+            df = read_dataframe(get_input_handle(file), engine=None)
 
             # 删除列（只删除存在的列）
-            existing_columns = [col for col in columns_to_delete if col in df.columns]
-            if existing_columns:
-                df = df.drop(columns=existing_columns)
+            df = drop_columns(df, columns_to_delete)
 
             # 创建输出文件
             if file.filename.endswith('.csv'):
@@ -444,26 +1048,26 @@ def delete_columns():
         zip_buffer = create_zip_file(files_dict)
         zip_filename = f"删除列结果_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
 
-        return send_file(
-            zip_buffer,
-            as_attachment=True,
-            download_name=zip_filename,
-            mimetype='application/zip'
-        )
+        return send_result(zip_buffer, zip_filename, 'application/zip')
 
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'处理文件时出错: {str(e)}'}), 500
 
 @app.route('/api/filter-data', methods=['POST'])
+@profiled('filter_data')
+@stored_result('filter_data')
+@admission_controlled('filter_data')
 def filter_data():
     """
     批量数据筛选
     """
     try:
-        if 'files' not in request.files:
+        files = request_files('files')
+        if files is None:
             return jsonify({'error': '没有上传文件'}), 400
 
-        files = request.files.getlist('files')
         column_name = request.form.get('column_name', '').strip()
         condition = request.form.get('condition', '').strip()
         value = request.form.get('value', '').strip()
@@ -474,86 +1078,41 @@ def filter_data():
         if not all([column_name, condition, value]):
             return jsonify({'error': '请填写所有筛选条件'}), 400
 
-        # 筛选条件映射
-        conditions = {
-            '等于': lambda df, col, val: df[col] == val,
-            '不等于': lambda df, col, val: df[col] != val,
-            '包含': lambda df, col, val: df[col].astype(str).str.contains(val, na=False),
-            '不包含': lambda df, col, val: ~df[col].astype(str).str.contains(val, na=False),
-            '大于': lambda df, col, val: pd.to_numeric(df[col], errors='coerce') > pd.to_numeric(val, errors='coerce'),
-            '小于': lambda df, col, val: pd.to_numeric(df[col], errors='coerce') < pd.to_numeric(val, errors='coerce'),
-            '大于等于': lambda df, col, val: pd.to_numeric(df[col], errors='coerce') >= pd.to_numeric(val, errors='coerce'),
-            '小于等于': lambda df, col, val: pd.to_numeric(df[col], errors='coerce') <= pd.to_numeric(val, errors='coerce'),
-        }
-
-        if condition not in conditions:
+        if condition not in FILTER_CONDITIONS:
             return jsonify({'error': '无效的筛选条件'}), 400
 
-        all_filtered_data = []
-
-        for file in files:
-            if not allowed_file(file.filename):
-                continue
-
-            # 读取文件
-            if file.filename.endswith('.csv'):
-                df = pd.read_csv(file, encoding='utf-8-sig')
-            else:
-                df = pd.read_excel(file)
-
-            # 检查列是否存在
-            if column_name not in df.columns:
-                continue
-
-            # 添加来源文件列
-            df['来源文件'] = file.filename
-
-            # 应用筛选条件
-            try:
-                if condition in ['大于', '小于', '大于等于', '小于等于']:
-                    # 数值比较
-                    mask = conditions[condition](df, column_name, value)
-                else:
-                    # 文本比较
-                    mask = conditions[condition](df, column_name, value)
-
-                filtered_df = df[mask]
-                if not filtered_df.empty:
-                    all_filtered_data.append(filtered_df)
-            except Exception as e:
-                # 如果筛选失败，跳过这个文件
-                continue
-
-        if not all_filtered_data:
+        # 读取文件
+        named_frames = [
+            (file.filename, read_dataframe(get_input_handle(file), engine=None))
+            for file in files if allowed_file(file.filename)
+        ]
+
+        # 筛选并合并所有结果
+        result_df = filter_named_frames(named_frames, column_name, condition, value)
+        if result_df is None:
             return jsonify({'error': '没有找到符合条件的数据'}), 400
 
-        # 合并所有筛选结果
-        result_df = pd.concat(all_filtered_data, ignore_index=True)
-
-        # 创建输出文件
-        output = create_temp_excel(result_df)
-        filename = f"筛选结果_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        # 创建输出文件（超出行数上限时自动拆分）
+        return send_excel_result(result_df, f"筛选结果_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
 
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'处理文件时出错: {str(e)}'}), 500
 
 @app.route('/api/convert-format', methods=['POST'])
+@profiled('convert_format')
+@stored_result('convert_format')
+@admission_controlled('convert_format')
 def convert_format():
     """
     格式转换（XLSX <-> CSV）
     """
     try:
-        if 'files' not in request.files:
+        files = request_files('files')
+        if files is None:
             return jsonify({'error': '没有上传文件'}), 400
 
-        files = request.files.getlist('files')
         convert_type = request.form.get('convert_type', '').strip()
 
         if not files or files[0].filename == '':
@@ -574,13 +1133,8 @@ def convert_format():
             if convert_type == 'xlsx_to_csv':
                 # XLSX转CSV
                 if file.filename.endswith('.xlsx') or file.filename.endswith('.xls'):
-                    # 读取Excel文件
-                    excel_file = pd.ExcelFile(file)
-
-                    # 每个sheet转换为一个CSV文件
-                    for sheet_name in excel_file.sheet_names:
-                        df = pd.read_excel(file, sheet_name=sheet_name, engine='openpyxl')
-
+                    # 读取Excel文件，每个sheet转换为一个CSV文件
+                    for sheet_name, df in read_excel_sheets(get_input_handle(file), engine=None):
                         # 创建CSV文件
                         output = create_temp_csv(df)
                         csv_filename = f"{base_name}_{sheet_name}.csv"
@@ -590,7 +1144,7 @@ def convert_format():
                 # CSV转XLSX
                 if file.filename.endswith('.csv'):
                     # 读取CSV文件
-                    df = pd.read_csv(file, encoding='utf-8-sig')
+                    df = read_dataframe(get_input_handle(file))
 
                     # 创建Excel文件
                     output = create_temp_excel(df)
@@ -604,16 +1158,400 @@ def convert_format():
         zip_buffer = create_zip_file(files_dict)
         zip_filename = f"格式转换结果_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
 
-        return send_file(
-            zip_buffer,
-            as_attachment=True,
-            download_name=zip_filename,
-            mimetype='application/zip'
-        )
+        return send_result(zip_buffer, zip_filename, 'application/zip')
+
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'处理文件时出错: {str(e)}'}), 500
+
+def _step_flag(step, key, default):
+    """读取流水线步骤中的开关参数，JSON布尔值和表单中的'true'/'false'字符串都可以"""
+    value = step.get(key, default)
+    if isinstance(value, bool):
+        return value
+    if not isinstance(value, str):
+        raise ValueError(f'参数 {key} 必须是true或false')
+    return value.lower() == 'true'
+
+def _step_text(step, key):
+    """读取流水线步骤中的文本参数（数字按文本处理），类型不对时抛出ValueError"""
+    value = step.get(key, '')
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f'参数 {key} 必须是文本')
+    return str(value).strip()
+
+def _step_merge_files(tables, step):
+    """流水线步骤：合并所有数据表"""
+    merged_df = merge_dataframes(
+        tables,
+        keep_headers=_step_flag(step, 'keep_headers', True),
+        add_source_column=_step_flag(step, 'add_source_column', False),
+    )
+    return [('合并结果', merged_df)]
+
+def _step_filter_data(tables, step):
+    """流水线步骤：与筛选接口相同，筛选所有数据表并合并为一个（添加来源文件列）"""
+    column_name = _step_text(step, 'column_name')
+    condition = _step_text(step, 'condition')
+    value = _step_text(step, 'value')
+    if not all([column_name, condition, value]):
+        raise ValueError('请填写所有筛选条件')
+    if condition not in FILTER_CONDITIONS:
+        raise ValueError('无效的筛选条件')
+
+    result_df = filter_named_frames(tables, column_name, condition, value)
+    if result_df is None:
+        raise ValueError('没有找到符合条件的数据')
+    return [('筛选结果', result_df)]
+
+def _step_delete_columns(tables, step):
+    """流水线步骤：删除每个数据表中的指定列"""
+    columns = step.get('columns', '')
+    if not isinstance(columns, (str, list)):
+        raise ValueError('参数 columns 必须是逗号分隔的列名或列名列表')
+    columns = parse_column_list(columns)
+    if not columns:
+        raise ValueError('请输入有效的列名')
+    return [(name, drop_columns(df, columns)) for name, df in tables]
+
+def _step_find_replace(tables, step):
+    """流水线步骤：在每个数据表中执行查找替换"""
+    find_text = _step_text(step, 'find_text')
+    replace_text = _step_text(step, 'replace_text')
+    if not find_text:
+        raise ValueError('请输入查找内容')
+    return [(name, replace_values(df, find_text, replace_text)) for name, df in tables]
+
+def _step_split_by_column(tables, step):
+    """流水线步骤：按列的唯一值拆分每个数据表"""
+    column_name = _step_text(step, 'column_name')
+    if not column_name:
+        raise ValueError('请输入列名')
+
+    result = []
+    for name, df in tables:
+        if column_name not in df.columns:
+            raise ValueError(f'列名 "{column_name}" 不存在')
+        for value, part_df in split_dataframe_by_column(df, column_name):
+            base_name = os.path.splitext(name)[0]
+            part_name = safe_name(value) if len(tables) == 1 else f"{base_name}_{safe_name(value)}"
+            result.append((part_name, part_df))
+    return result
+
+def _step_split_by_rows(tables, step):
+    """流水线步骤：按行数拆分每个数据表"""
+    try:
+        rows_per_file = int(step.get('rows_per_file', 0))
+        if rows_per_file <= 0:
+            raise ValueError()
+    except (TypeError, ValueError):
+        raise ValueError('请输入有效的正整数')
+
+    result = []
+    for name, df in tables:
+        for i, part_df in enumerate(split_dataframe_by_rows(df, rows_per_file)):
+            base_name = os.path.splitext(name)[0]
+            part_name = f"第{i+1}部分" if len(tables) == 1 else f"{base_name}_第{i+1}部分"
+            result.append((part_name, part_df))
+    return result
+
+# 流水线支持的操作，参数名与对应接口的表单字段一致
+PIPELINE_STEPS = {
+    'merge_files': _step_merge_files,
+    'filter_data': _step_filter_data,
+    'delete_columns': _step_delete_columns,
+    'find_replace': _step_find_replace,
+    'split_by_column': _step_split_by_column,
+    'split_by_rows': _step_split_by_rows,
+}
+
+def run_pipeline(tables, steps):
+    """
+    在内存中依次执行流水线步骤
+    tables为(名称, DataFrame)列表，步骤之间不做任何序列化
+    """
+    for index, step in enumerate(steps):
+        if not isinstance(step, dict) or step.get('op') not in PIPELINE_STEPS:
+            raise ValueError(f'第{index+1}步: 不支持的操作')
+        try:
+            tables = PIPELINE_STEPS[step['op']](tables, step)
+        except ValueError as e:
+            raise ValueError(f'第{index+1}步 ({step["op"]}): {e}')
+    return tables
+
+@app.route('/api/pipeline', methods=['POST'])
+@profiled('pipeline')
+@stored_result('pipeline')
+@admission_controlled('pipeline')
+def pipeline():
+    """
+    流水线处理：在内存中串联多个操作，只在最后输出一次结果
+    steps为JSON数组，例如 [{"op": "merge_files"}, {"op": "delete_columns", "columns": "工资"}]
+    """
+    try:
+        files = request_files('files')
+        if files is None:
+            return jsonify({'error': '没有上传文件'}), 400
+
+        if not files or files[0].filename == '':
+            return jsonify({'error': '请选择文件'}), 400
+
+        try:
+            steps = json.loads(request.form.get('steps', ''))
+        except ValueError:
+            return jsonify({'error': '流水线步骤必须是有效的JSON'}), 400
+
+        if not isinstance(steps, list) or not steps:
+            return jsonify({'error': '请提供至少一个流水线步骤'}), 400
+
+        output_format = request.form.get('output_format', 'xlsx').strip().lower()
+        if output_format not in ('xlsx', 'csv'):
+            return jsonify({'error': '输出格式只支持xlsx或csv'}), 400
+
+        tables = []
+        for file in files:
+            if not allowed_file(file.filename):
+                continue
+            tables.append((file.filename, read_dataframe(get_input_handle(file))))
+
+        if not tables:
+            return jsonify({'error': '没有有效的文件'}), 400
+
+        try:
+            tables = run_pipeline(tables, steps)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        create_output = create_temp_csv if output_format == 'csv' else create_temp_excel
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        # 只有一个结果时直接返回文件，否则打包为ZIP
+        if len(tables) == 1:
+            output = create_output(tables[0][1])
+            mimetype = 'text/csv' if output_format == 'csv' else \
+                'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            return send_result(output, f"流水线结果_{timestamp}.{output_format}", mimetype)
+
+        files_dict = {}
+        for name, df in tables:
+            base_name = safe_name(os.path.splitext(name)[0])
+            filename = f"{base_name}.{output_format}"
+            if filename in files_dict:
+                filename = f"{base_name}_{len(files_dict)+1}.{output_format}"
+            files_dict[filename] = create_output(df)
+
+        zip_buffer = create_zip_file(files_dict)
+        return send_result(zip_buffer, f"流水线结果_{timestamp}.zip", 'application/zip')
+
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'处理文件时出错: {str(e)}'}), 500
+
+@app.route('/api/profile', methods=['POST'])
+@profiled('profile')
+@admission_controlled('profile')
+def profile_columns():
+    """
+    列概况统计：一次遍历所有上传文件（同名列合并统计），返回每列的类型、缺失值数、
+    近似不同值数、最小/最大值和高频值，用于在拆分、筛选前了解数据
+    """
+    try:
+        files = request_files('files')
+        if files is None:
+            return jsonify({'error': '没有上传文件'}), 400
 
+        if not files or files[0].filename == '':
+            return jsonify({'error': '请选择文件'}), 400
+
+        try:
+            top_k = int(request.form.get('top_k', 10))
+            if not 1 <= top_k <= 100:
+                raise ValueError()
+        except ValueError:
+            return jsonify({'error': 'top_k必须是1到100之间的整数'}), 400
+
+        table_profile = TableProfile()
+        profiled_files = []
+        for file in files:
+            if not allowed_file(file.filename):
+                continue
+            for chunk in iter_dataframe_chunks(get_input_handle(file), app.config['PROFILE_CHUNK_ROWS']):
+                table_profile.add(chunk)
+            profiled_files.append(file.filename)
+
+        if not profiled_files:
+            return jsonify({'error': '没有有效的Excel文件'}), 400
+
+        return jsonify(dict(table_profile.to_dict(top_k), files=profiled_files))
+
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'处理文件时出错: {str(e)}'}), 500
+
+# 支持行数预估的操作：(文件字段, 是否统计所有sheet)
+ROW_ESTIMATE_OPERATIONS = {
+    'merge_files': ('files', False),
+    'merge_sheets': ('file', True),
+    'filter_data': ('files', False),
+}
+
+@app.route('/api/row-estimate', methods=['POST'])
+def row_estimate():
+    """
+    处理前的行数预估：只读取文件结构（xlsx）或统计换行符（csv），不解析单元格
+    结果超出单个sheet的行数上限时返回提示，前端据此在开始处理前提醒用户
+    """
+    try:
+        operation = request.form.get('operation', '')
+        if operation not in ROW_ESTIMATE_OPERATIONS:
+            return jsonify({'error': '不支持的操作'}), 400
+
+        field, all_sheets = ROW_ESTIMATE_OPERATIONS[operation]
+        files = request_files(field)
+        if not files or files[0].filename == '':
+            return jsonify({'error': '没有上传文件'}), 400
+
+        rows = 0
+        complete = True
+        for file in files:
+            if not allowed_file(file.filename):
+                continue
+            try:
+                count = count_input_rows(get_input_handle(file), all_sheets)
+            except zipfile.BadZipFile:
+                return jsonify({'error': f'文件 "{file.filename}" 不是有效的xlsx文件'}), 400
+            if count is None:
+                complete = False
+            else:
+                rows += count
+
+        rows_per_sheet = app.config['EXCEL_MAX_ROWS'] - 1
+        parts = max(1, -(-rows // rows_per_sheet))
+        result = {
+            'rows': rows,
+            'complete': complete,
+            'rows_per_sheet': rows_per_sheet,
+            'parts': parts,
+        }
+        if parts > 1:
+            # 筛选前的行数是结果行数的上限
+            prefix = '结果最多约' if operation == 'filter_data' else '结果约'
+            unit = '个文件' if request.form.get('rollover') == 'files' else '个Sheet'
+            result['warning'] = (f'{prefix} {rows} 行，超过Excel单个Sheet的上限（{rows_per_sheet} 行），'
+                                 f'将拆分为 {parts} {unit}')
+        return jsonify(result)
+
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'处理文件时出错: {str(e)}'}), 500
 
+@app.route('/api/results/<result_id>', methods=['GET'])
+def download_result(result_id):
+    """
+    重新下载已保存的处理结果，支持Range断点续传
+    """
+    meta = get_result_store().get(result_id)
+    if meta is None:
+        return jsonify({'error': '结果不存在或已过期'}), 404
+    return send_stored_result(meta)
+
+@app.route('/api/uploads', methods=['POST'])
+def start_upload():
+    """
+    开始或恢复分块上传
+    请求体JSON: filename、size、chunk_size、chunk_hashes（每块的SHA-256）
+    返回upload_id和尚未接收的块序号；服务器上已有相同内容时complete为true，无需上传
+    """
+    data = request.get_json(silent=True) or {}
+    filename = str(data.get('filename', '')).strip()
+    if not filename or not allowed_file(filename):
+        return jsonify({'error': '只支持Excel文件'}), 400
+
+    try:
+        result = get_upload_store().start(filename, data.get('size'), data.get('chunk_size'), data.get('chunk_hashes'))
+    except UploadStoreFull as e:
+        return jsonify({'error': str(e)}), 503
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    result['chunk_size'] = app.config['UPLOAD_CHUNK_SIZE']
+    return jsonify(result)
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """
+    查询分块上传进度
+    """
+    try:
+        return jsonify(get_upload_store().status(upload_id))
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 404
+
+@app.route('/api/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def upload_chunk(upload_id, index):
+    """
+    上传一个分块（请求体为分块的原始字节），服务器校验SHA-256后写入
+    """
+    try:
+        received = get_upload_store().write_chunk(upload_id, index, request.stream)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'upload_id': upload_id, 'index': index, 'received': received})
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    """
+    所有分块上传完成后组装文件，之后可在各功能接口中通过upload_ids/upload_id引用
+    """
+    try:
+        meta = get_upload_store().complete(upload_id)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'upload_id': upload_id, 'complete': True, 'filename': meta['filename'], 'size': meta['size']})
+
+@app.route('/api/admission-stats', methods=['GET'])
+def admission_stats():
+    """
+    准入控制状态：内存占用、排队长度和各操作的计数（只包含处理本请求的服务进程）
+    """
+    stats = get_admission_controller().stats()
+    stats['server_workers'] = app.config['SERVER_WORKERS']
+    return jsonify(stats)
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_profiles():
+    """
+    列出已保存的性能分析结果（需要管理令牌）
+    """
+    if not has_admin_token():
+        return jsonify({'error': '需要有效的管理令牌'}), 403
+    return jsonify({'profiles': get_profile_store().list()})
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """
+    下载性能分析结果（pstats格式，需要管理令牌）；format=text时返回按累计耗时排序的文本摘要
+    """
+    if not has_admin_token():
+        return jsonify({'error': '需要有效的管理令牌'}), 403
+
+    store = get_profile_store()
+    meta = store.get(profile_id)
+    if meta is None:
+        return jsonify({'error': '性能分析结果不存在'}), 404
+
+    if request.args.get('format') == 'text':
+        return app.response_class(meta['summary'], mimetype='text/plain')
+    return send_file(
+        store.profile_path(profile_id),
+        as_attachment=True,
+        download_name=f'{profile_id}_{meta["operation"]}.prof',
+        mimetype='application/octet-stream'
+    )
+
 @app.errorhandler(413)
 def too_large(e):
     """文件过大错误处理"""
@@ -629,5 +1567,23 @@ def internal_error(e):
     """500错误处理"""
     return jsonify({'error': '服务器内部错误'}), 500
 
+def warm_up_data_stack():
+    """
+    预热数据处理库：导入pandas/openpyxl（以及pyarrow，如已安装）并实际读写一次xlsx和csv，加载所有读写器模块
+    在预加载模式（如 gunicorn --preload）下于主进程调用，fork出的worker以写时复制方式共享这些内存页
+    """
+    df = pd.DataFrame({'a': [1, 2], 'b': ['x', 'y']})
+    pd.read_excel(create_temp_excel(df), engine='openpyxl')
+    read_csv_file(create_temp_csv(df))
+
+    # 把预热产生的对象移出垃圾回收的跟踪范围，避免worker中的GC触碰共享页导致复制
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+# 预加载模式：设置环境变量 EXCEL_TOOLKIT_PRELOAD=1 后在导入时预热（配合 gunicorn --preload 使用）
+if os.environ.get('EXCEL_TOOLKIT_PRELOAD', '').lower() in ('1', 'true', 'yes'):
+    warm_up_data_stack()
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Excel工具箱批处理命令行
+不经过HTTP，直接对本地文件执行工具箱操作，结果写入输出目录
+支持通配符、多进程并行，以及增量运行（输入内容和参数都没有变化的文件会被跳过）
+
+示例:
+    python batch.py split_by_column "data/*.xlsx" -o out --column-name 部门
+    python batch.py convert_format data/ -o out --convert-type xlsx_to_csv -j 8
+    python batch.py merge_files data/ -o out --add-source-column
+"""
+
+import os
+import io
+import sys
+import glob
+import json
+import time
+import zipfile
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app import (
+    app, allowed_file, safe_name, parse_column_list, read_dataframe, read_excel_sheets,
+    merge_sheet_frames, merge_dataframes, filter_named_frames, replace_values, drop_columns,
+    split_dataframe_by_column, split_dataframe_by_rows, run_pipeline, create_temp_excel,
+    create_temp_csv, create_temp_workbook, FILTER_CONDITIONS,
+)
+from column_profile import estimate_distinct
+from xlsx_inplace import replace_in_workbook
+
+# 输出目录中记录已完成任务的清单文件
+MANIFEST_NAME = '.excel_toolkit_manifest.json'
+
+# 把所有输入文件合并为一个输出的操作，其余操作对每个文件分别处理
+COMBINED_OPERATIONS = {'merge_files', 'filter_data'}
+
+
+def pattern_root(pattern):
+    """通配符中不含通配符的目录部分，作为计算相对路径的根目录"""
+    if os.path.isdir(pattern):
+        return pattern
+    if not glob.has_magic(pattern):
+        return os.path.dirname(pattern)
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) if parts else os.curdir
+
+
+def expand_inputs(patterns):
+    """
+    展开路径、目录和通配符，返回去重排序后的可处理文件列表
+    每项为(绝对路径, 相对于目录或通配符根目录的路径)，输出文件按相对路径放在输出目录的对应子目录中
+    """
+    inputs = {}
+    for pattern in patterns:
+        root = os.path.abspath(pattern_root(pattern))
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '**', '*')
+        for path in glob.glob(pattern, recursive=True):
+            if os.path.isfile(path) and allowed_file(path):
+                path = os.path.abspath(path)
+                inputs.setdefault(path, os.path.relpath(path, root))
+    return sorted(inputs.items())
+
+
+def applies_to(operation, params, path):
+    """操作是否处理该文件：格式转换只处理与转换类型对应格式的文件，其余文件不产生输出"""
+    if operation == 'convert_format':
+        return os.path.basename(path).endswith('.csv') == (params['convert_type'] == 'csv_to_xlsx')
+    return True
+
+
+def output_name_key(operation, relative_path):
+    """
+    决定输出文件名的那部分相对路径：查找替换和删除列的输出保留原文件名（含扩展名），
+    其余逐个文件处理的操作用不含扩展名的文件名命名输出
+    """
+    if operation in ('find_replace', 'delete_columns'):
+        return os.path.normcase(relative_path)
+    return os.path.normcase(os.path.splitext(relative_path)[0])
+
+
+def find_conflicts(operation, inputs):
+    """
+    找出输出文件名相同、会互相覆盖的输入文件
+    返回冲突的绝对路径列表的列表
+    """
+    groups = {}
+    for path, relative_path in inputs:
+        groups.setdefault(output_name_key(operation, relative_path), []).append(path)
+    return [paths for paths in groups.values() if len(paths) > 1]
+
+
+def file_sha256(path):
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def task_key(operation, params, input_hashes):
+    """
+    同一操作、参数、输入文件相对路径和内容得到相同的任务键（输出路径取决于输入的相对路径）
+    input_hashes为[相对路径, SHA-256]列表
+    """
+    payload = json.dumps([operation, params, input_hashes], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def run_combined_operation(operation, params, inputs):
+    """
+    把所有输入文件合并为一个输出（merge_files、filter_data）
+    inputs为(绝对路径, 相对路径)列表，来源文件列使用相对路径；返回(相对输出路径, BytesIO)列表
+    """
+    if operation == 'merge_files':
+        named_frames = [(relative_path, read_dataframe(path, path)) for path, relative_path in inputs]
+        merged_df = merge_dataframes(named_frames, params['keep_headers'], params['add_source_column'])
+        output_format = params['output_format']
+        create_output = create_temp_csv if output_format == 'csv' else create_temp_excel
+        return [(f"合并结果.{output_format}", create_output(merged_df))]
+
+    if operation == 'filter_data':
+        named_frames = [
+            (relative_path, read_dataframe(path, path, engine=None)) for path, relative_path in inputs
+        ]
+        result_df = filter_named_frames(named_frames, params['column_name'], params['condition'], params['value'])
+        if result_df is None:
+            raise ValueError('没有找到符合条件的数据')
+        return [("筛选结果.xlsx", create_temp_excel(result_df))]
+
+    raise ValueError(f'不支持的操作: {operation}')
+
+
+def run_operation(operation, params, path):
+    """
+    对单个文件执行操作
+    返回(相对输出路径, BytesIO)列表，参数无效时抛出ValueError
+    """
+    filename = os.path.basename(path)
+    base_name = os.path.splitext(filename)[0]
+    is_csv = filename.endswith('.csv')
+
+    if operation == 'merge_sheets':
+        merged_df = merge_sheet_frames(read_excel_sheets(path), params['add_sheet_column'])
+        return [(f"{base_name}_合并Sheet.xlsx", create_temp_excel(merged_df))]
+
+    if operation == 'split_by_column':
+        df = read_dataframe(path, filename)
+        if params['column_name'] not in df.columns:
+            raise ValueError(f'列名 "{params["column_name"]}" 不存在')
+        # 与接口相同，预估的文件数超过上限时拒绝（可用--max-parts调高）
+        parts = estimate_distinct(df[params['column_name']])
+        if parts > params['max_parts']:
+            raise ValueError(f'列 "{params["column_name"]}" 约有 {parts} 个不同的值，'
+                             f'超过单次拆分的上限（{params["max_parts"]} 个文件）')
+        return [
+            (os.path.join(base_name, f"{safe_name(value)}.xlsx"), create_temp_excel(part_df))
+            for value, part_df in split_dataframe_by_column(df, params['column_name'])
+        ]
+
+    if operation == 'split_by_rows':
+        df = read_dataframe(path, filename)
+        return [
+            (os.path.join(base_name, f"第{i+1}部分.xlsx"), create_temp_excel(part_df))
+            for i, part_df in enumerate(split_dataframe_by_rows(df, params['rows_per_file']))
+        ]
+
+    if operation == 'find_replace':
+        find_text, replace_text = params['find_text'], params['replace_text']
+        if is_csv:
+            output = create_temp_csv(replace_values(read_dataframe(path, filename), find_text, replace_text))
+        elif params['engine'] == 'inplace' and filename.endswith('.xlsx'):
+            output = io.BytesIO()
+            with zipfile.ZipFile(path) as source_zip:
+                replace_in_workbook(source_zip, output, find_text, replace_text)
+            output.seek(0)
+        else:
+            sheet_frames = [
+                (sheet_name, replace_values(df, find_text, replace_text))
+                for sheet_name, df in read_excel_sheets(path)
+            ]
+            output = create_temp_workbook(sheet_frames)
+        return [(f"替换_{filename}", output)]
+
+    if operation == 'delete_columns':
+        df = drop_columns(read_dataframe(path, filename, engine=None), parse_column_list(params['columns']))
+        output = create_temp_csv(df) if is_csv else create_temp_excel(df)
+        return [(f"删除列_{filename}", output)]
+
+    if operation == 'convert_format':
+        if params['convert_type'] == 'xlsx_to_csv' and not is_csv:
+            return [
+                (f"{base_name}_{sheet_name}.csv", create_temp_csv(df))
+                for sheet_name, df in read_excel_sheets(path, engine=None)
+            ]
+        if params['convert_type'] == 'csv_to_xlsx' and is_csv:
+            return [(f"{base_name}.xlsx", create_temp_excel(read_dataframe(path, filename)))]
+        return []
+
+    if operation == 'pipeline':
+        output_format = params['output_format']
+        create_output = create_temp_csv if output_format == 'csv' else create_temp_excel
+        tables = run_pipeline([(filename, read_dataframe(path, filename))], params['steps'])
+        if len(tables) == 1:
+            return [(f"{base_name}.{output_format}", create_output(tables[0][1]))]
+        return [
+            (os.path.join(base_name, f"{safe_name(os.path.splitext(name)[0])}.{output_format}"), create_output(df))
+            for name, df in tables
+        ]
+
+    raise ValueError(f'不支持的操作: {operation}')
+
+
+def write_atomic(path, content):
+    """先写临时文件再重命名，中途失败不会留下不完整的输出"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def content_sha256(content):
+    """计算内存中内容的SHA-256"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def process_task(operation, params, inputs, output_dir):
+    """
+    执行一个任务并把结果写入输出目录（在工作进程中运行）
+    合并类操作的输出在输出目录根部，其余操作的输出放在与输入文件相对路径对应的子目录中
+    返回{相对输出路径: SHA-256}
+    """
+    if operation in COMBINED_OPERATIONS:
+        results = run_combined_operation(operation, params, inputs)
+    else:
+        path, relative_path = inputs[0]
+        subdir = os.path.dirname(relative_path)
+        results = [
+            (os.path.join(subdir, output_path), output)
+            for output_path, output in run_operation(operation, params, path)
+        ]
+
+    outputs = {}
+    for relative_path, output in results:
+        content = output.getbuffer()
+        write_atomic(os.path.join(output_dir, relative_path), content)
+        outputs[relative_path] = content_sha256(content)
+    return outputs
+
+
+def load_manifest(output_dir):
+    """读取输出目录中的任务清单"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    """保存任务清单"""
+    content = json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')
+    write_atomic(os.path.join(output_dir, MANIFEST_NAME), content)
+
+
+def is_up_to_date(entry, output_dir):
+    """清单中记录的输出文件都还存在且内容未被修改或覆盖时，认为该任务已是最新"""
+    if entry is None or not isinstance(entry.get('outputs'), dict):
+        return False
+    for relative_path, content_hash in entry['outputs'].items():
+        path = os.path.join(output_dir, relative_path)
+        if not os.path.isfile(path) or file_sha256(path) != content_hash:
+            return False
+    return True
+
+
+def run_batch(operation, params, inputs, output_dir, jobs=None, force=False):
+    """
+    批量执行操作，inputs为expand_inputs()的结果
+    合并类操作把所有输入作为一个任务，其余操作每个文件一个任务
+    返回(处理成功数, 跳过数, 失败数)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+
+    if operation in COMBINED_OPERATIONS:
+        tasks = [inputs]
+    else:
+        tasks = [[item] for item in inputs]
+
+    pending = {}
+    skipped = 0
+    for task in tasks:
+        label = task[0][0] if len(task) == 1 else f"{len(task)} 个文件"
+        key = task_key(operation, params, [[relative_path, file_sha256(path)] for path, relative_path in task])
+        if not force and is_up_to_date(manifest.get(key), output_dir):
+            print(f"⏭️  已是最新，跳过: {label}")
+            skipped += 1
+        else:
+            pending[key] = (label, task)
+
+    succeeded = failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(process_task, operation, params, task, output_dir): key
+                for key, (_, task) in pending.items()
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                label, task = pending[key]
+                try:
+                    outputs = future.result()
+                except Exception as e:
+                    print(f"❌ 处理失败: {label} ({e})")
+                    failed += 1
+                    continue
+
+                manifest[key] = {
+                    'inputs': [path for path, _ in task],
+                    'outputs': outputs,
+                    'finished_at': time.time(),
+                }
+                print(f"✅ {label} -> {len(outputs)} 个文件")
+                succeeded += 1
+    finally:
+        # 即使中途中断，已完成的文件也会记录下来，下次运行时跳过
+        save_manifest(output_dir, manifest)
+
+    return succeeded, skipped, failed
+
+
+def build_parser():
+    """命令行参数，各操作的参数名与对应接口的表单字段一致"""
+    parser = argparse.ArgumentParser(description='Excel工具箱批处理命令行')
+    subparsers = parser.add_subparsers(dest='operation', required=True)
+
+    def add_operation(name, help_text):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('inputs', nargs='+', help='输入文件、目录或通配符（如 "data/*.xlsx"）')
+        sub.add_argument('-o', '--output-dir', required=True, help='输出目录')
+        sub.add_argument('-j', '--jobs', type=int, default=None, help='并行进程数（默认为CPU核数）')
+        sub.add_argument('--force', action='store_true', help='忽略清单，重新处理所有文件')
+        return sub
+
+    sub = add_operation('merge_files', '把所有输入文件合并为一个文件')
+    sub.add_argument('--no-keep-headers', dest='keep_headers', action='store_false',
+                     help='不跳过后续文件的第一行（对应接口的keep_headers=false）')
+    sub.add_argument('--add-source-column', action='store_true', help='添加来源文件列（输入文件的相对路径）')
+    sub.add_argument('--output-format', choices=['xlsx', 'csv'], default='xlsx', help='输出格式')
+
+    sub = add_operation('filter_data', '筛选所有输入文件，结果合并为一个文件')
+    sub.add_argument('--column-name', required=True, help='筛选的列名')
+    sub.add_argument('--condition', choices=list(FILTER_CONDITIONS), required=True, help='筛选条件')
+    sub.add_argument('--value', required=True, help='筛选值')
+
+    sub = add_operation('merge_sheets', '合并每个文件的多个Sheet')
+    sub.add_argument('--add-sheet-column', action='store_true', help='添加来源Sheet列')
+
+    sub = add_operation('split_by_column', '按列拆分')
+    sub.add_argument('--column-name', required=True, help='拆分依据的列名')
+    sub.add_argument('--max-parts', type=int, default=app.config['SPLIT_MAX_PARTS'],
+                     help='每个文件最多拆分出的文件数，预估超出时该文件处理失败（默认与接口相同）')
+
+    sub = add_operation('split_by_rows', '按行数拆分')
+    sub.add_argument('--rows-per-file', type=int, required=True, help='每个文件的行数')
+
+    sub = add_operation('find_replace', '查找与替换')
+    sub.add_argument('--find-text', required=True, help='查找内容')
+    sub.add_argument('--replace-text', default='', help='替换内容')
+    sub.add_argument('--engine', choices=['pandas', 'inplace'], default='pandas', help='替换引擎')
+
+    sub = add_operation('delete_columns', '删除指定列')
+    sub.add_argument('--columns', required=True, help='要删除的列名，多个用逗号分隔')
+
+    sub = add_operation('convert_format', '格式转换')
+    sub.add_argument('--convert-type', choices=['xlsx_to_csv', 'csv_to_xlsx'], required=True, help='转换类型')
+
+    sub = add_operation('pipeline', '对每个文件执行流水线')
+    sub.add_argument('--steps', required=True, help='流水线步骤（JSON数组，或以@开头的JSON文件路径）')
+    sub.add_argument('--output-format', choices=['xlsx', 'csv'], default='xlsx', help='输出格式')
+
+    return parser
+
+
+def main(argv=None):
+    """主函数"""
+    args = build_parser().parse_args(argv)
+    params = {
+        key: value for key, value in vars(args).items()
+        if key not in ('operation', 'inputs', 'output_dir', 'jobs', 'force')
+    }
+
+    if args.operation == 'split_by_rows' and args.rows_per_file <= 0:
+        print("❌ 请输入有效的正整数")
+        return 2
+
+    if args.operation == 'pipeline':
+        steps = params['steps']
+        try:
+            if steps.startswith('@'):
+                with open(steps[1:], 'r', encoding='utf-8') as f:
+                    steps = f.read()
+            params['steps'] = json.loads(steps)
+        except (OSError, ValueError) as e:
+            print(f"❌ 无法读取流水线步骤: {e}")
+            return 2
+
+    inputs = [
+        (path, relative_path) for path, relative_path in expand_inputs(args.inputs)
+        if applies_to(args.operation, params, path)
+    ]
+    if not inputs:
+        print("❌ 没有找到可处理的文件")
+        return 2
+
+    # 逐个文件处理时，输出文件名相同（例如分别来自两个通配符的同名文件）的输出会互相覆盖
+    conflicts = [] if args.operation in COMBINED_OPERATIONS else find_conflicts(args.operation, inputs)
+    if conflicts:
+        print("❌ 以下输入文件的输出文件名相同，会互相覆盖，请分别处理或调整输入路径:")
+        for paths in conflicts:
+            print("   " + "  ".join(paths))
+        return 2
+
+    print(f"🔧 {args.operation}: 共 {len(inputs)} 个文件 -> {args.output_dir}")
+    start = time.time()
+    succeeded, skipped, failed = run_batch(
+        args.operation, params, inputs, args.output_dir, jobs=args.jobs, force=args.force)
+    print(f"完成: 成功 {succeeded}，跳过 {skipped}，失败 {failed}，用时 {time.time() - start:.1f} 秒")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
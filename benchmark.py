@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Excel工具箱性能基准测试
+每个基准在独立的子进程或临时目录中运行，输出纯文本结果，便于在不同提交之间对比
+
+用法:
+    python benchmark.py                 # 运行全部基准
+    python benchmark.py --only import   # 只运行指定基准
+    python benchmark.py --only csv --csv-size-mb 1024   # 1GB CSV的读取吞吐量
+    python benchmark.py --only sheets --sheets 32      # 多sheet工作簿按核数并行解析的加速比
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_python(code, env=None):
+    """在新的Python进程中执行代码，返回其标准输出（去掉首尾空白）"""
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=ROOT,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.strip()
+
+
+def median_seconds(code, repeat, env=None):
+    """多次冷启动执行代码（代码需打印耗时秒数），返回中位数"""
+    return statistics.median(float(run_python(code, env)) for _ in range(repeat))
+
+
+# 导入app并处理第一个请求，打印总耗时；同时检查pandas是否真的被加载
+_IMPORT_APP = '''
+import sys, time
+start = time.perf_counter()
+from app import app
+client = app.test_client()
+client.get('/')
+client.get('/no-such-page')
+elapsed = time.perf_counter() - start
+assert {check}, 'pandas loaded: %s' % ('pandas.core' in sys.modules)
+print(elapsed)
+'''
+
+_IMPORT_DATA_STACK = '''
+import time
+start = time.perf_counter()
+import pandas, openpyxl
+print(time.perf_counter() - start)
+'''
+
+
+def bench_import(args):
+    """冷启动耗时：导入app并响应主页和404"""
+    repeat = args.repeat
+    print('== import: 冷启动（导入app并响应 / 和 404） ==')
+
+    lazy = median_seconds(_IMPORT_APP.format(check="'pandas.core' not in sys.modules"), repeat)
+    print(f'延迟导入（默认）:       {lazy * 1000:8.1f} ms')
+
+    stack = median_seconds(_IMPORT_DATA_STACK, repeat)
+    print(f'pandas + openpyxl 导入: {stack * 1000:8.1f} ms')
+
+    preload = median_seconds(
+        _IMPORT_APP.format(check="'pandas.core' in sys.modules"),
+        repeat,
+        env={'EXCEL_TOOLKIT_PRELOAD': '1'},
+    )
+    print(f'预加载模式（预热）:     {preload * 1000:8.1f} ms')
+    print()
+
+
+# 读取CSV并打印耗时；每次在新进程中执行，避免上一次的内存占用影响结果
+_READ_CSV = '''
+import time
+import pandas as pd
+from csv_reader import read_csv_file
+start = time.perf_counter()
+df = {call}
+print(time.perf_counter() - start)
+'''
+
+
+def write_sample_csv(path, size_mb):
+    """生成约size_mb大小的CSV（UTF-8带BOM，含中文、数字、日期和带引号的文本）"""
+    import pandas as pd
+
+    rows = 20000
+    block = pd.DataFrame({
+        '编号': range(rows),
+        '姓名': [f'员工{i}' for i in range(rows)],
+        '部门': [['销售部', '技术部', '财务部', '人事部'][i % 4] for i in range(rows)],
+        '金额': [i * 1.25 for i in range(rows)],
+        '日期': [f'2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}' for i in range(rows)],
+        '备注': [f'备注,第{i}条' for i in range(rows)],
+    }).to_csv(index=False, header=False)
+
+    target = size_mb * 1024 * 1024
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        f.write('编号,姓名,部门,金额,日期,备注\n')
+        written = 0
+        while written < target:
+            f.write(block)
+            written += len(block.encode('utf-8'))
+
+
+def bench_csv(args):
+    """CSV读取吞吐量：原来的pd.read_csv与探测编码/分隔符后的读取（pyarrow或pandas）"""
+    from csv_reader import load_pyarrow
+
+    print(f'== csv: 读取 {args.csv_size_mb}MB CSV ==')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'sample.csv')
+        write_sample_csv(path, args.csv_size_mb)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+
+        readers = [
+            ('pd.read_csv（原方式）', "pd.read_csv(path, encoding='utf-8-sig')"),
+            ('read_csv_file(pandas)', "read_csv_file(path, engine='pandas')"),
+        ]
+        if load_pyarrow() is not None:
+            readers.append(('read_csv_file(pyarrow)', "read_csv_file(path, engine='pyarrow')"))
+        else:
+            print('（未安装pyarrow，跳过多线程解析器）')
+
+        for label, call in readers:
+            seconds = median_seconds(_READ_CSV.format(call=call.replace('path', repr(path))), args.repeat)
+            print(f'{label:24s} {seconds:8.2f} s  {size_mb / seconds:8.1f} MB/s')
+    print()
+
+
+def write_sample_workbook(path, sheets, rows):
+    """生成包含sheets个sheet、每个sheet rows行的xlsx"""
+    import pandas as pd
+    from xlsx_stream import write_workbook
+
+    df = pd.DataFrame({
+        '编号': range(rows),
+        '姓名': [f'员工{i}' for i in range(rows)],
+        '金额': [i * 1.25 for i in range(rows)],
+        '部门': [['销售部', '技术部', '财务部', '人事部'][i % 4] for i in range(rows)],
+    })
+    with open(path, 'wb') as f:
+        write_workbook(f, [(f'Sheet{i + 1}', df) for i in range(sheets)])
+
+
+def bench_sheets(args):
+    """合并Sheet的解析耗时：单进程逐个解析与按不同核数并行解析同一个工作簿"""
+    import multiprocessing
+    import pandas as pd
+    from concurrent.futures import ProcessPoolExecutor
+    from parallel_sheets import sheet_sizes, parse_sheets, read_sheets_parallel
+
+    cores = os.cpu_count() or 1
+    print(f'== sheets: 解析 {args.sheets} 个sheet × {args.sheet_rows} 行（CPU核数 {cores}） ==')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'sample.xlsx')
+        write_sample_workbook(path, args.sheets, args.sheet_rows)
+        sheets = sheet_sizes(path)
+
+        def serial():
+            with pd.ExcelFile(path, engine='openpyxl') as excel_file:
+                return [excel_file.parse(name) for name in excel_file.sheet_names]
+
+        def timed(func):
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                func()
+                times.append(time.perf_counter() - start)
+            return statistics.median(times)
+
+        baseline = timed(serial)
+        print(f'单进程:      {baseline:8.2f} s')
+
+        worker_counts = sorted({w for w in (2, 4, 8, 16) if w <= cores} | ({cores} if cores > 1 else set()))
+        if not worker_counts:
+            print('（只有1个CPU核，跳过并行测量）')
+        for workers in worker_counts:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                # 先让每个工作进程完成导入，计时只包含解析
+                list(pool.map(parse_sheets, [path] * workers, [[sheets[0][0]]] * workers))
+                seconds = timed(lambda: read_sheets_parallel(pool, path, sheets, workers))
+            print(f'{workers:2d} 个进程:  {seconds:8.2f} s  加速比 {baseline / seconds:5.2f}x')
+    print()
+
+
+BENCHMARKS = {
+    'import': bench_import,
+    'csv': bench_csv,
+    'sheets': bench_sheets,
+}
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='Excel工具箱性能基准测试')
+    parser.add_argument('--only', choices=sorted(BENCHMARKS), action='append', help='只运行指定基准（可重复）')
+    parser.add_argument('--repeat', type=int, default=5, help='每项测量的重复次数')
+    parser.add_argument('--csv-size-mb', type=int, default=64, help='csv基准生成的文件大小（MB）')
+    parser.add_argument('--sheets', type=int, default=8, help='sheets基准工作簿的sheet数')
+    parser.add_argument('--sheet-rows', type=int, default=20000, help='sheets基准每个sheet的行数')
+    args = parser.parse_args(argv)
+
+    for name in args.only or BENCHMARKS:
+        BENCHMARKS[name](args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Excel批量操作工具箱 - 分块上传
+浏览器按固定大小分块上传文件，每块带SHA-256校验，失败的块可以单独重传
+上传完成的文件按内容指纹保存，相同内容的文件不需要重复上传
+Author: StanleyChanH
+License: MIT
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+
+class UploadError(Exception):
+    """分块上传请求无效（参数错误、校验失败等）"""
+
+
+class UploadStoreFull(UploadError):
+    """上传存储的总大小或进行中的上传数已达上限，暂时不能开始新的上传"""
+
+
+def compute_fingerprint(size, chunk_size, chunk_hashes):
+    """由文件大小、分块大小和每块的SHA-256计算文件指纹，作为上传ID"""
+    payload = json.dumps([size, chunk_size, chunk_hashes])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def is_valid_upload_id(upload_id):
+    """检查上传ID格式（64位十六进制），防止路径穿越"""
+    return len(upload_id) == 64 and all(c in '0123456789abcdef' for c in upload_id)
+
+
+class UploadStore:
+    """
+    分块上传的本地存储
+    上传中: <id>.part（预分配大小的数据文件）、<id>.session.json、<id>.chunks/<序号>（已接收块的标记）
+    已完成: <id>.data、<id>.json
+    用标记文件而不是在会话文件中记录已接收的块，多个worker进程并行写入不同的块时不会冲突
+    所有数据文件（含预分配的.part）的总大小不超过max_total_bytes，进行中的上传不超过max_sessions个
+    """
+
+    def __init__(self, root, chunk_size, max_file_size, ttl_seconds, max_total_bytes, max_sessions):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.max_file_size = max_file_size
+        self.ttl_seconds = ttl_seconds
+        self.max_total_bytes = max_total_bytes
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, upload_id, suffix):
+        return os.path.join(self.root, f'{upload_id}{suffix}')
+
+    def _chunk_count(self, size):
+        return max(1, (size + self.chunk_size - 1) // self.chunk_size)
+
+    def _load_session(self, upload_id):
+        if not is_valid_upload_id(upload_id):
+            raise UploadError('无效的上传ID')
+        try:
+            with open(self._path(upload_id, '.session.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise UploadError('上传任务不存在或已过期')
+
+    def usage(self):
+        """返回(数据文件总字节数, 进行中的上传数)"""
+        total = sessions = 0
+        for name in os.listdir(self.root):
+            if name.endswith(('.part', '.data')):
+                try:
+                    total += os.path.getsize(os.path.join(self.root, name))
+                except OSError:
+                    pass
+            elif name.endswith('.session.json'):
+                sessions += 1
+        return total, sessions
+
+    def _received_chunks(self, upload_id):
+        try:
+            return sorted(int(name) for name in os.listdir(self._path(upload_id, '.chunks')))
+        except OSError:
+            return []
+
+    def get(self, upload_id):
+        """返回已完成上传的元数据（含数据文件路径），不存在时返回None"""
+        if not is_valid_upload_id(upload_id):
+            return None
+        try:
+            with open(self._path(upload_id, '.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        meta['path'] = self._path(upload_id, '.data')
+        if not os.path.exists(meta['path']):
+            return None
+
+        # 每次使用都会延长保留时间
+        try:
+            os.utime(self._path(upload_id, '.json'))
+        except OSError:
+            pass
+        return meta
+
+    def start(self, filename, size, chunk_size, chunk_hashes):
+        """
+        开始（或恢复）一个上传
+        内容已存在时直接返回完成状态；否则返回尚未接收的块序号
+        """
+        if chunk_size != self.chunk_size:
+            raise UploadError(f'分块大小必须为 {self.chunk_size} 字节')
+        if not isinstance(size, int) or size < 0 or size > self.max_file_size:
+            raise UploadError('文件大小无效或超出限制')
+        if not isinstance(chunk_hashes, list) or not all(
+                isinstance(h, str) and is_valid_upload_id(h) for h in chunk_hashes):
+            raise UploadError('分块校验值无效')
+        if len(chunk_hashes) != self._chunk_count(size):
+            raise UploadError('分块校验值数量与文件大小不符')
+
+        self.cleanup()
+        upload_id = compute_fingerprint(size, chunk_size, chunk_hashes)
+        if self.get(upload_id) is not None:
+            return {'upload_id': upload_id, 'complete': True, 'missing': []}
+
+        session_path = self._path(upload_id, '.session.json')
+        with self._lock:
+            if not os.path.exists(session_path):
+                total, sessions = self.usage()
+                if sessions >= self.max_sessions or total + size > self.max_total_bytes:
+                    raise UploadStoreFull('服务器上传空间不足，请稍后重试')
+
+                with open(self._path(upload_id, '.part'), 'wb') as f:
+                    f.truncate(size)
+                os.makedirs(self._path(upload_id, '.chunks'), exist_ok=True)
+                session = {
+                    'filename': filename,
+                    'size': size,
+                    'chunk_hashes': chunk_hashes,
+                    'created_at': time.time(),
+                }
+                with open(session_path, 'w', encoding='utf-8') as f:
+                    json.dump(session, f, ensure_ascii=False)
+
+        received = set(self._received_chunks(upload_id))
+        missing = [i for i in range(len(chunk_hashes)) if i not in received]
+        return {'upload_id': upload_id, 'complete': False, 'missing': missing}
+
+    def write_chunk(self, upload_id, index, stream):
+        """边接收边校验写入一个块，校验失败时抛出UploadError，返回已接收的块数"""
+        session = self._load_session(upload_id)
+        if not 0 <= index < len(session['chunk_hashes']):
+            raise UploadError('无效的分块序号')
+
+        offset = index * self.chunk_size
+        expected_length = min(self.chunk_size, session['size'] - offset)
+        digest = hashlib.sha256()
+        data = bytearray()
+        for block in iter(lambda: stream.read(256 * 1024), b''):
+            data += block
+            if len(data) > expected_length:
+                raise UploadError('分块大小不正确')
+            digest.update(block)
+
+        if len(data) != expected_length:
+            raise UploadError('分块大小不正确')
+        if digest.hexdigest() != session['chunk_hashes'][index]:
+            raise UploadError('分块校验失败，请重新上传该分块')
+
+        with open(self._path(upload_id, '.part'), 'r+b') as f:
+            f.seek(offset)
+            f.write(data)
+        open(os.path.join(self._path(upload_id, '.chunks'), str(index)), 'wb').close()
+        return len(self._received_chunks(upload_id))
+
+    def status(self, upload_id):
+        """返回上传进度"""
+        meta = self.get(upload_id)
+        if meta is not None:
+            return {'upload_id': upload_id, 'complete': True, 'missing': []}
+        session = self._load_session(upload_id)
+        received = set(self._received_chunks(upload_id))
+        missing = [i for i in range(len(session['chunk_hashes'])) if i not in received]
+        return {'upload_id': upload_id, 'complete': False, 'missing': missing}
+
+    def complete(self, upload_id):
+        """所有块都接收后组装为完整文件；仍有缺失的块时抛出UploadError"""
+        if self.get(upload_id) is not None:
+            return self.get(upload_id)
+
+        session = self._load_session(upload_id)
+        if len(self._received_chunks(upload_id)) != len(session['chunk_hashes']):
+            raise UploadError('还有分块未上传')
+
+        os.replace(self._path(upload_id, '.part'), self._path(upload_id, '.data'))
+        meta = {'filename': session['filename'], 'size': session['size'], 'created_at': time.time()}
+        with open(self._path(upload_id, '.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        os.unlink(self._path(upload_id, '.session.json'))
+        shutil.rmtree(self._path(upload_id, '.chunks'), ignore_errors=True)
+        return self.get(upload_id)
+
+    def cleanup(self):
+        """删除过期的上传任务和已完成的文件"""
+        now = time.time()
+        for name in os.listdir(self.root):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                if now - os.path.getmtime(path) <= self.ttl_seconds:
+                    continue
+            except OSError:
+                continue
+
+            upload_id = name.split('.', 1)[0]
+            for suffix in ('.json', '.data', '.session.json', '.part'):
+                try:
+                    os.unlink(self._path(upload_id, suffix))
+                except OSError:
+                    pass
+            shutil.rmtree(self._path(upload_id, '.chunks'), ignore_errors=True)
@@ -0,0 +1,211 @@
+"""
+Excel批量操作工具箱 - 列概况统计
+逐块遍历数据，统计每列的缺失值数、近似不同值数（HyperLogLog）、最小/最大值、高频值和推断类型
+每列只保留固定大小的统计结构，内存占用与行数无关
+Author: StanleyChanH
+License: MIT
+"""
+
+import math
+
+# HyperLogLog寄存器数为2^HLL_PRECISION（16384个，每个1字节），标准误差约0.8%
+HLL_PRECISION = 14
+
+# 高频值统计最多保留的计数器数；不同值不超过该数时计数是精确的
+HEAVY_HITTERS_CAPACITY = 1000
+
+# pandas.api.types.infer_dtype的结果到列类型的映射，未列出的视为mixed
+_KINDS = {
+    'string': 'string',
+    'integer': 'integer',
+    'floating': 'float',
+    'mixed-integer-float': 'float',
+    'decimal': 'float',
+    'boolean': 'boolean',
+    'datetime64': 'datetime',
+    'datetime': 'datetime',
+    'date': 'datetime',
+    'timedelta64': 'duration',
+    'timedelta': 'duration',
+    'time': 'time',
+}
+
+
+class HyperLogLog:
+    """HyperLogLog基数估计，对pandas的64位哈希值批量更新寄存器"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        import numpy as np
+
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values):
+        """加入一批非空值（Series）"""
+        import numpy as np
+        import pandas as pd
+
+        if len(values) == 0:
+            return
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+
+        # 剩余64-p位中前导零的个数+1；用log2求最高位，浮点舍入的误差对估计结果可以忽略
+        rest = hashes << np.uint64(p)
+        with np.errstate(divide='ignore'):
+            bit_length = np.floor(np.log2(rest.astype(np.float64))) + 1
+        rank = np.where(rest == 0, 65 - p, 65 - bit_length)
+        np.maximum.at(self.registers, index, np.clip(rank, 1, 65 - p).astype(np.uint8))
+
+    def estimate(self):
+        """估计的不同值个数"""
+        import numpy as np
+
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)  # 小基数时使用线性计数
+        return raw
+
+
+class HeavyHitters:
+    """
+    Misra-Gries高频值统计，最多保留capacity个计数器
+    从未淘汰过计数器时（不同值不超过capacity），计数和不同值个数都是精确的
+    """
+
+    def __init__(self, capacity=HEAVY_HITTERS_CAPACITY):
+        self.capacity = capacity
+        self.counts = None
+        self.exact = True
+
+    def add(self, values):
+        """加入一批非空值（Series）"""
+        counts = values.value_counts()
+        self.counts = counts if self.counts is None else self.counts.add(counts, fill_value=0)
+        if len(self.counts) > self.capacity:
+            threshold = self.counts.nlargest(self.capacity + 1).iloc[-1]
+            self.counts = self.counts[self.counts > threshold] - threshold
+            self.exact = False
+
+    def top(self, k):
+        """按计数从高到低返回前k个(值, 计数)"""
+        if self.counts is None:
+            return []
+        return [(value, int(count)) for value, count in self.counts.nlargest(k).items()]
+
+
+def _json_value(value):
+    """统计结果中的值转为可JSON序列化的类型"""
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+class ColumnProfile:
+    """单列的统计"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.kinds = set()
+        self.minimum = None
+        self.maximum = None
+        self.comparable = True
+        self.distinct = HyperLogLog()
+        self.heavy_hitters = HeavyHitters()
+
+    def add(self, series):
+        """加入一个数据块中的该列"""
+        import pandas as pd
+
+        values = series.dropna()
+        self.nulls += len(series) - len(values)
+        self.count += len(values)
+        if values.empty:
+            return
+
+        self.kinds.add(_KINDS.get(pd.api.types.infer_dtype(values, skipna=False), 'mixed'))
+        self.distinct.add(values)
+        self.heavy_hitters.add(values)
+
+        if self.comparable:
+            # 类型混杂的列（如数字和文本）无法比较大小，不再统计最小/最大值
+            try:
+                low, high = values.min(), values.max()
+                self.minimum = low if self.minimum is None else min(self.minimum, low)
+                self.maximum = high if self.maximum is None else max(self.maximum, high)
+            except TypeError:
+                self.comparable = False
+                self.minimum = self.maximum = None
+
+    @property
+    def kind(self):
+        """推断的列类型：integer、float、string、boolean、datetime、duration、time、mixed 或 empty"""
+        if not self.kinds:
+            return 'empty'
+        if self.kinds <= {'integer', 'float'}:
+            return 'float' if 'float' in self.kinds else 'integer'
+        return next(iter(self.kinds)) if len(self.kinds) == 1 else 'mixed'
+
+    def distinct_count(self):
+        """不同值个数，返回(个数, 是否精确)"""
+        if self.heavy_hitters.exact:
+            return (0 if self.heavy_hitters.counts is None else len(self.heavy_hitters.counts)), True
+        return min(int(round(self.distinct.estimate())), self.count), False
+
+    def to_dict(self, top_k):
+        distinct, distinct_exact = self.distinct_count()
+        comparable = self.comparable and self.kind != 'mixed'
+        return {
+            'name': _json_value(self.name),
+            'type': self.kind,
+            'count': self.count,
+            'nulls': self.nulls,
+            'distinct': distinct,
+            'distinct_exact': distinct_exact,
+            'min': _json_value(self.minimum) if comparable else None,
+            'max': _json_value(self.maximum) if comparable else None,
+            'top': [{'value': _json_value(value), 'count': count} for value, count in self.heavy_hitters.top(top_k)],
+            'top_exact': self.heavy_hitters.exact,
+        }
+
+
+class TableProfile:
+    """多个数据块（可来自多个文件）的按列统计，同名列合并统计"""
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+
+    def add(self, df):
+        self.rows += len(df)
+        for name in df.columns:
+            if name not in self.columns:
+                self.columns[name] = ColumnProfile(name)
+            self.columns[name].add(df[name])
+
+    def to_dict(self, top_k=10):
+        return {
+            'rows': self.rows,
+            'columns': [column.to_dict(top_k) for column in self.columns.values()],
+        }
+
+
+def estimate_distinct(series):
+    """估计一列的不同值个数（与列概况统计使用相同的方法）"""
+    column = ColumnProfile(None)
+    column.add(series)
+    return column.distinct_count()[0]
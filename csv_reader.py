@@ -0,0 +1,230 @@
+"""
+Excel批量操作工具箱 - CSV读取
+从文件开头的一小段探测编码（UTF-8/GBK等）和分隔符（逗号、分号、制表符、竖线），
+安装了pyarrow时使用其多线程解析器，否则（或pyarrow无法解析时）使用pandas
+Author: StanleyChanH
+License: MIT
+"""
+
+import io
+import os
+import csv
+import codecs
+import functools
+
+# 探测编码和分隔符时读取的文件开头字节数
+SNIFF_BYTES = 64 * 1024
+
+# 支持的分隔符
+DELIMITERS = ',;\t|'
+
+# 按顺序尝试的编码；GB18030兼容GBK和GB2312
+FALLBACK_ENCODINGS = ('utf-8', 'gb18030')
+
+# 与pandas默认一致的缺失值和布尔值，保证两种解析器得到相同的结果
+NA_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+]
+TRUE_VALUES = ['True', 'TRUE', 'true']
+FALSE_VALUES = ['False', 'FALSE', 'false']
+
+
+class WrongEncoding(ValueError):
+    """按探测出的编码无法解码整个文件（开头只有ASCII字符时探测结果可能不对）"""
+
+
+def candidate_encodings(encoding):
+    """探测出的编码及其后备编码：按UTF-8解码失败时再用GB18030尝试"""
+    if encoding in FALLBACK_ENCODINGS:
+        return FALLBACK_ENCODINGS[FALLBACK_ENCODINGS.index(encoding):]
+    return (encoding,)
+
+
+def sniff_encoding(prefix):
+    """根据BOM或试解码判断编码"""
+    if prefix.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if prefix.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            # 前缀可能截断在多字节字符中间，用增量解码器忽略末尾不完整的字符
+            codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+def sniff_delimiter(text):
+    """根据前几行判断分隔符，无法判断时使用逗号"""
+    lines = text.splitlines()[:50]
+    if len(lines) > 1 and not text.endswith(('\n', '\r')):
+        lines = lines[:-1]  # 最后一行可能不完整
+    try:
+        return csv.Sniffer().sniff('\n'.join(lines), delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        return ','
+
+
+def sniff_csv(prefix):
+    """探测编码和分隔符，返回(encoding, delimiter)"""
+    encoding = sniff_encoding(prefix)
+    return encoding, sniff_delimiter(prefix.decode(encoding, errors='ignore'))
+
+
+@functools.lru_cache(maxsize=None)
+def load_pyarrow():
+    """导入pyarrow，未安装时返回None"""
+    try:
+        import pyarrow
+        import pyarrow.csv
+        import pyarrow.compute
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def _read_with_pyarrow(pa, source, prefix, encoding, delimiter):
+    """
+    用pyarrow多线程解析，返回DataFrame；结果可能与pandas不一致时返回None
+    日期/时间列保持为文本（与pandas默认行为一致），全空列转为浮点型，含缺失值的布尔列中缺失值为NaN
+    """
+    read_options = pa.csv.ReadOptions(encoding='utf8' if encoding.startswith('utf-8') else encoding)
+    parse_options = pa.csv.ParseOptions(delimiter=delimiter, newlines_in_values=True)
+
+    def convert_options(column_types=None):
+        return pa.csv.ConvertOptions(
+            column_types=column_types,
+            null_values=NA_VALUES,
+            true_values=TRUE_VALUES,
+            false_values=FALSE_VALUES,
+            strings_can_be_null=True,
+        )
+
+    # 先用文件开头的完整行推断列类型，找出需要保持为文本的日期/时间列
+    sample = prefix[:prefix.rfind(b'\n') + 1] or prefix
+    schema = pa.csv.read_csv(io.BytesIO(sample), read_options, parse_options, convert_options()).schema
+    if len(set(schema.names)) != len(schema.names) or '' in schema.names:
+        return None  # 重复列名和空列名由pandas自动重命名（如 Unnamed: 2）
+    column_types = {field.name: pa.string() for field in schema if pa.types.is_temporal(field.type)}
+    # 整数列先按文本读取：pyarrow会把0x10解析为16，pandas保持为文本
+    integer_columns = [field.name for field in schema if pa.types.is_integer(field.type)]
+    column_types.update((name, pa.string()) for name in integer_columns)
+
+    table = pa.csv.read_csv(source, read_options, parse_options, convert_options(column_types))
+    if table.num_rows == 0:
+        return None  # 只有表头时pandas的列为object类型
+    if any(pa.types.is_binary(field.type) for field in table.schema):
+        raise WrongEncoding(encoding)
+
+    for i, field in enumerate(table.schema):
+        if field.name in integer_columns:
+            column = table.column(i)
+            if pa.compute.any(pa.compute.match_substring(column, 'x', ignore_case=True)).as_py():
+                return None
+            # 超出int64范围时转换失败（ArrowInvalid），由pandas解析为uint64或文本
+            table = table.set_column(i, field.name, column.cast(pa.int64()))
+        elif pa.types.is_floating(field.type):
+            # 超出int64范围的整数被pyarrow解析为浮点数而丢失精度，pandas保持精确值
+            largest = pa.compute.max(pa.compute.abs(table.column(i))).as_py()
+            if largest is not None and largest >= 2 ** 63:
+                return None
+        elif pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+    df = table.to_pandas(split_blocks=True)
+
+    # pyarrow把含缺失值的布尔列转为包含None的object列，pandas中缺失值为NaN
+    for field in table.schema:
+        if pa.types.is_boolean(field.type) and table.column(field.name).null_count:
+            df[field.name] = df[field.name].where(df[field.name].notna(), float('nan'))
+    return df
+
+
+def count_csv_rows(path):
+    """按换行符统计数据行数（不含表头），字段中带换行的文件会略微多算"""
+    lines = 0
+    last = b''
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            lines += chunk.count(b'\n')
+            last = chunk[-1:]
+    if last and last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def read_csv_file(source, engine='auto'):
+    """
+    读取CSV为DataFrame，source可以是路径或二进制文件对象
+    engine: auto（有pyarrow时使用pyarrow）、pyarrow 或 pandas
+    """
+    import pandas as pd
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            prefix = f.read(SNIFF_BYTES)
+    else:
+        position = source.tell()
+        prefix = source.read(SNIFF_BYTES)
+        source.seek(position)
+    encoding, delimiter = sniff_csv(prefix)
+    encodings = candidate_encodings(encoding)
+
+    def rewind():
+        if not isinstance(source, (str, os.PathLike)):
+            source.seek(position)
+
+    pa = load_pyarrow() if engine in ('auto', 'pyarrow') else None
+    for i, encoding in enumerate(encodings):
+        last = i == len(encodings) - 1
+        if pa is not None and prefix:
+            try:
+                df = _read_with_pyarrow(pa, source, prefix, encoding, delimiter)
+            except WrongEncoding:
+                if not last:
+                    rewind()
+                    continue
+                df = None
+            except (pa.ArrowInvalid, UnicodeDecodeError):
+                # 行的字段数不一致等情况，交给pandas处理（并给出pandas的错误信息）
+                df = None
+            if df is not None:
+                return df
+            rewind()
+
+        try:
+            return pd.read_csv(source, encoding=encoding, sep=delimiter)
+        except UnicodeDecodeError:
+            if last:
+                raise
+            rewind()
+
+
+def iter_csv_chunks(path, chunk_rows):
+    """
+    按块读取CSV（编码和分隔符同样自动识别），每次返回最多chunk_rows行的DataFrame
+    读到后面才出现无法按探测编码解码的字符时，改用后备编码并跳过已返回的行继续读取
+    """
+    import pandas as pd
+
+    with open(path, 'rb') as f:
+        encoding, delimiter = sniff_csv(f.read(SNIFF_BYTES))
+    encodings = candidate_encodings(encoding)
+    rows = 0
+    for i, encoding in enumerate(encodings):
+        offset = rows
+        skiprows = range(1, offset + 1) if offset else None
+        try:
+            with pd.read_csv(path, encoding=encoding, sep=delimiter, chunksize=chunk_rows,
+                             skiprows=skiprows) as reader:
+                for chunk in reader:
+                    if offset:
+                        chunk.index += offset
+                    yield chunk
+                    rows += len(chunk)
+            return
+        except UnicodeDecodeError:
+            if i == len(encodings) - 1:
+                raise
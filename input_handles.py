@@ -0,0 +1,188 @@
+"""
+Excel批量操作工具箱 - 上传文件句柄
+每个上传文件只落盘一次，之后通过路径、文件对象或mmap视图读取，用完即删除
+Author: StanleyChanH
+License: MIT
+"""
+
+import io
+import os
+import time
+import mmap
+import hashlib
+import zipfile
+import tempfile
+from contextlib import contextmanager
+
+# 临时文件名前缀，后面跟创建进程的PID，用于清理崩溃进程遗留的文件
+TEMP_PREFIX = 'upload_'
+
+# 无法判断进程是否存活时（Windows），超过该时长的临时文件视为遗留文件
+STALE_SECONDS = 24 * 60 * 60
+
+
+def create_temp_file(directory):
+    """在指定目录创建带进程PID前缀的临时文件，返回打开的文件对象（关闭后不会自动删除）"""
+    os.makedirs(directory, exist_ok=True)
+    return tempfile.NamedTemporaryFile(
+        dir=directory,
+        prefix=f'{TEMP_PREFIX}{os.getpid()}_',
+        delete=False,
+    )
+
+
+def _process_exists(pid):
+    """判断进程是否存在，无法判断时返回None"""
+    if os.name == 'nt':
+        # Windows上os.kill会直接结束进程，不能用来探测
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def cleanup_stale_files(directory):
+    """删除已退出进程遗留的临时文件，返回删除的文件数"""
+    if not os.path.isdir(directory):
+        return 0
+
+    removed = 0
+    for name in os.listdir(directory):
+        if not name.startswith(TEMP_PREFIX):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            pid = int(name[len(TEMP_PREFIX):].split('_', 1)[0])
+        except ValueError:
+            continue
+
+        if pid == os.getpid():
+            continue
+        alive = _process_exists(pid)
+        try:
+            if alive is False or (alive is None and time.time() - os.path.getmtime(path) > STALE_SECONDS):
+                os.unlink(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+class _MappedFile(io.RawIOBase):
+    """为mmap提供完整的文件对象接口（Python 3.13之前mmap没有seekable方法，无法直接交给zipfile）"""
+
+    def __init__(self, view):
+        self._view = view
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._view.seek(offset, whence)
+        return self._view.tell()
+
+    def tell(self):
+        return self._view.tell()
+
+    def read(self, size=-1):
+        return self._view.read(size)
+
+    def readinto(self, buffer):
+        data = self._view.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class InputHandle:
+    """
+    上传文件的统一句柄
+    文件内容保存在一个临时文件中，可通过path交给pandas，或通过mmap零拷贝读取
+    """
+
+    def __init__(self, path, filename, stream=None, delete=True):
+        self.path = path
+        self.filename = filename
+        self._stream = stream
+        self._delete = delete
+        self._sha256 = None
+
+    @classmethod
+    def from_upload(cls, file, directory):
+        """
+        从werkzeug的FileStorage创建句柄
+        如果上传流本身已经是该目录下的临时文件，则直接接管，不再复制
+        """
+        stream = file.stream
+        stream_path = getattr(stream, 'name', None)
+        if isinstance(stream_path, str) and os.path.dirname(os.path.abspath(stream_path)) == os.path.abspath(directory):
+            stream.flush()
+            return cls(stream_path, file.filename, stream=stream)
+
+        file.stream.seek(0)
+        with create_temp_file(directory) as tmp_file:
+            file.save(tmp_file)
+        file.stream.seek(0)
+        return cls(tmp_file.name, file.filename)
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+
+    @property
+    def sha256(self):
+        """文件内容的SHA-256（通过mmap计算，不复制数据）"""
+        if self._sha256 is None:
+            digest = hashlib.sha256()
+            if self.size > 0:
+                with self.mmap() as view:
+                    digest.update(view)
+            self._sha256 = digest.hexdigest()
+        return self._sha256
+
+    def open(self):
+        """以二进制只读方式打开文件"""
+        return open(self.path, 'rb')
+
+    def mmap(self):
+        """返回文件的只读mmap视图，调用方负责关闭；空文件无法映射，抛出ValueError"""
+        if self.size == 0:
+            raise ValueError(f'文件 "{self.filename}" 为空')
+        with self.open() as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @contextmanager
+    def zip_view(self):
+        """以ZIP方式读取文件（xlsx本质上是ZIP），底层使用mmap；空文件同样抛出zipfile.BadZipFile"""
+        if self.size == 0:
+            raise zipfile.BadZipFile(f'文件 "{self.filename}" 为空')
+        view = self.mmap()
+        try:
+            with zipfile.ZipFile(_MappedFile(view)) as zf:
+                yield zf
+        finally:
+            view.close()
+
+    def close(self):
+        """关闭并删除临时文件（delete=False时保留文件，例如分块上传保存的文件）"""
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        if not self._delete:
+            return
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
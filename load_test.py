@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Excel工具箱并发压力测试
+自动在本地启动服务器（单进程多线程的Flask服务器，或多worker的gunicorn），按场景文件混合发送各种操作，
+并发分阶段逐步增加，统计每个阶段的延迟分位数、吞吐量、错误率和每个worker进程的峰值内存
+结果保存为JSON，便于在不同提交之间对比
+
+用法:
+    python load_test.py                                      # 使用默认场景 examples/load_scenario.json
+    python load_test.py --server gunicorn --workers 4         # 使用gunicorn启动4个worker
+    python load_test.py --stage-duration 5                    # 每个阶段只运行5秒（快速检查）
+    python load_test.py --compare load_results/上一次的结果.json  # 与之前的结果对比
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+
+import requests
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCENARIO = os.path.join(ROOT, 'examples', 'load_scenario.json')
+DEFAULT_OUTPUT_DIR = os.path.join(ROOT, 'load_results')
+
+FILE_MIMETYPES = {
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.xls': 'application/vnd.ms-excel',
+    '.csv': 'text/csv',
+}
+
+
+def load_scenario(path):
+    """读取并检查场景文件，格式错误时抛出ValueError"""
+    with open(path, 'r', encoding='utf-8') as f:
+        scenario = json.load(f)
+
+    if not scenario.get('stages'):
+        raise ValueError('场景中没有定义阶段（stages）')
+    for stage in scenario['stages']:
+        if stage.get('concurrency', 0) < 1 or stage.get('duration', 0) <= 0:
+            raise ValueError('每个阶段都需要正整数的concurrency和正数的duration')
+
+    files = scenario.get('files', {})
+    if not scenario.get('operations'):
+        raise ValueError('场景中没有定义操作（operations）')
+    for operation in scenario['operations']:
+        for names in operation.get('files', {}).values():
+            missing = [name for name in names if name not in files]
+            if missing:
+                raise ValueError(f'操作 {operation["name"]} 引用了未定义的文件: {", ".join(missing)}')
+    return scenario
+
+
+def sample_dataframe(rows):
+    """生成测试数据（含中文文本、数字和日期）"""
+    import pandas as pd
+
+    return pd.DataFrame({
+        '编号': range(rows),
+        '姓名': [f'员工{i}' for i in range(rows)],
+        '部门': [['销售部', '技术部', '财务部', '人事部', '市场部'][i % 5] for i in range(rows)],
+        '金额': [(i * 37) % 10000 for i in range(rows)],
+        '日期': [f'2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}' for i in range(rows)],
+    })
+
+
+def prepare_files(scenario):
+    """准备场景中的文件：path指定现有文件，rows+format则生成测试数据；返回{名称: (文件名, 内容)}"""
+    from xlsx_stream import write_workbook
+
+    prepared = {}
+    for name, spec in scenario.get('files', {}).items():
+        if 'path' in spec:
+            path = spec['path'] if os.path.isabs(spec['path']) else os.path.join(ROOT, spec['path'])
+            with open(path, 'rb') as f:
+                prepared[name] = (os.path.basename(path), f.read())
+            continue
+
+        df = sample_dataframe(spec['rows'])
+        if spec.get('format', 'xlsx') == 'csv':
+            content = df.to_csv(index=False).encode('utf-8-sig')
+            prepared[name] = (f'{name}.csv', content)
+        else:
+            with tempfile.TemporaryFile() as f:
+                write_workbook(f, [('Sheet1', df)])
+                f.seek(0)
+                prepared[name] = (f'{name}.xlsx', f.read())
+    return prepared
+
+
+def free_port():
+    """获取一个空闲的本地端口"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def read_status_kb(pid, key):
+    """从/proc/<pid>/status读取内存指标（KB），不支持时返回None"""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith(key + ':'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def reset_peak_rss(pid):
+    """重置进程的峰值内存记录（Linux），使每个阶段单独统计峰值"""
+    try:
+        with open(f'/proc/{pid}/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+class LocalServer:
+    """
+    在子进程中启动待测服务器
+    flask: 单进程多线程（与 python app.py 相同的服务方式）；gunicorn: 多个worker进程
+    """
+
+    def __init__(self, server='flask', workers=1, threads=8):
+        self.server = server
+        self.workers = workers
+        self.threads = threads
+        self.port = free_port()
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        self.process = None
+
+    def start(self, timeout=60):
+        if self.server == 'gunicorn':
+            command = [
+                sys.executable, '-m', 'gunicorn', '-w', str(self.workers), '--threads', str(self.threads),
+                '-b', f'127.0.0.1:{self.port}', '--timeout', '600', 'app:app',
+            ]
+        else:
+            command = [
+                sys.executable, '-c',
+                f"from app import app; app.run(host='127.0.0.1', port={self.port}, threaded=True)",
+            ]
+        self.process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'服务器启动失败（退出码 {self.process.returncode}）')
+            try:
+                if requests.get(self.base_url, timeout=1).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError('服务器启动超时')
+
+    def worker_pids(self):
+        """处理请求的进程：flask为服务器进程本身，gunicorn为master的子进程"""
+        if self.server != 'gunicorn':
+            return [self.process.pid]
+        try:
+            with open(f'/proc/{self.process.pid}/task/{self.process.pid}/children', 'r') as f:
+                return [int(pid) for pid in f.read().split()]
+        except OSError:
+            return []
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def percentile(sorted_values, fraction):
+    """最近秩法计算分位数"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(records, duration):
+    """统计一组请求记录：数量、错误率、吞吐量、延迟分位数（毫秒）、状态码分布"""
+    latencies = sorted(record['latency'] * 1000 for record in records)
+    errors = sum(1 for record in records if record['status'] is None or record['status'] >= 400)
+    statuses = {}
+    for record in records:
+        key = str(record['status'] or 'exception')
+        statuses[key] = statuses.get(key, 0) + 1
+    return {
+        'requests': len(records),
+        'errors': errors,
+        'error_rate': round(errors / len(records), 4) if records else 0.0,
+        'throughput': round(len(records) / duration, 3) if duration else 0.0,
+        'latency_ms': {
+            name: round(percentile(latencies, fraction), 1) if latencies else None
+            for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))
+        },
+        'status_codes': statuses,
+    }
+
+
+def build_request(operation, files, bypass_cache):
+    """构造一个请求的multipart文件列表和表单"""
+    multipart = []
+    for field, names in operation.get('files', {}).items():
+        for name in names:
+            filename, content = files[name]
+            mimetype = FILE_MIMETYPES.get(os.path.splitext(filename)[1], 'application/octet-stream')
+            multipart.append((field, (filename, content, mimetype)))
+
+    form = dict(operation.get('form', {}))
+    if bypass_cache:
+        # 服务器按输入文件和表单参数缓存结果，加一个随机参数让每个请求都真正执行
+        form['_nonce'] = f'{random.getrandbits(64):016x}'
+    return multipart, form
+
+
+def run_stage(base_url, scenario, files, concurrency, duration, timeout):
+    """以固定并发持续发送请求duration秒，返回请求记录列表"""
+    operations = scenario['operations']
+    weights = [operation.get('weight', 1) for operation in operations]
+    bypass_cache = scenario.get('bypass_cache', True)
+    deadline = time.monotonic() + duration
+    records = []
+    lock = threading.Lock()
+
+    def client():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            operation = random.choices(operations, weights)[0]
+            multipart, form = build_request(operation, files, bypass_cache)
+            start = time.monotonic()
+            try:
+                response = session.post(base_url + operation['path'], files=multipart, data=form, timeout=timeout)
+                status = response.status_code
+            except requests.RequestException:
+                status = None
+            record = {'operation': operation['name'], 'status': status, 'latency': time.monotonic() - start}
+            with lock:
+                records.append(record)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records
+
+
+def git_revision():
+    """当前提交（有未提交的修改时加上-dirty），不在git仓库中时返回unknown"""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return f'{revision}-dirty' if dirty else revision
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_stage(result):
+    """打印一个阶段的结果"""
+    total = result['total']
+    latency = total['latency_ms']
+    print(f"并发 {result['concurrency']:3d}: {total['requests']:5d} 个请求  "
+          f"{total['throughput']:7.2f} 请求/秒  错误率 {total['error_rate'] * 100:5.1f}%  "
+          f"p50 {latency['p50']} ms  p95 {latency['p95']} ms  p99 {latency['p99']} ms")
+    for name, stats in result['operations'].items():
+        print(f"    {name:16s} {stats['requests']:5d} 个  错误 {stats['errors']:4d}  "
+              f"p50 {stats['latency_ms']['p50']} ms  p95 {stats['latency_ms']['p95']} ms")
+    rss = ', '.join(f"{pid}: {mb} MB" for pid, mb in result['peak_rss_mb'].items())
+    print(f"    峰值内存（每个worker）: {rss or '无法获取'}")
+
+
+def print_comparison(current, previous):
+    """按并发数对比两次结果的吞吐量、p95延迟和错误率"""
+    print(f"\n== 对比 {previous['revision']}（{previous['started_at']}） -> {current['revision']} ==")
+    previous_stages = {stage['concurrency']: stage for stage in previous['stages']}
+    for stage in current['stages']:
+        old = previous_stages.get(stage['concurrency'])
+        if old is None:
+            continue
+        new_total, old_total = stage['total'], old['total']
+
+        def change(new, old_value):
+            if not old_value or new is None:
+                return 'n/a'
+            return f'{(new - old_value) / old_value * 100:+.1f}%'
+
+        print(f"并发 {stage['concurrency']:3d}: "
+              f"吞吐量 {old_total['throughput']} -> {new_total['throughput']} "
+              f"({change(new_total['throughput'], old_total['throughput'])})  "
+              f"p95 {old_total['latency_ms']['p95']} -> {new_total['latency_ms']['p95']} ms "
+              f"({change(new_total['latency_ms']['p95'], old_total['latency_ms']['p95'])})  "
+              f"错误率 {old_total['error_rate'] * 100:.1f}% -> {new_total['error_rate'] * 100:.1f}%")
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='Excel工具箱并发压力测试')
+    parser.add_argument('--scenario', default=DEFAULT_SCENARIO, help='场景文件（JSON）')
+    parser.add_argument('--server', choices=['flask', 'gunicorn'], default='flask', help='服务器类型')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn的worker进程数')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn每个worker的线程数')
+    parser.add_argument('--stage-duration', type=float, default=None, help='覆盖每个阶段的持续秒数')
+    parser.add_argument('--timeout', type=float, default=300, help='单个请求的超时秒数')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help='结果保存目录')
+    parser.add_argument('--compare', help='与之前保存的结果文件对比')
+    args = parser.parse_args(argv)
+
+    try:
+        scenario = load_scenario(args.scenario)
+        previous = None
+        if args.compare:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"❌ 无法读取场景或对比文件: {e}")
+        return 2
+
+    print(f"🔧 场景 {scenario.get('name', os.path.basename(args.scenario))}，准备测试文件...")
+    files = prepare_files(scenario)
+
+    server = LocalServer(args.server, args.workers, args.threads)
+    print(f"🚀 启动服务器（{args.server}）: {server.base_url}")
+    try:
+        server.start()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        server.stop()
+        return 1
+
+    result = {
+        'scenario': scenario.get('name', os.path.basename(args.scenario)),
+        'revision': git_revision(),
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'server': args.server,
+        'workers': args.workers if args.server == 'gunicorn' else 1,
+        'cpu_count': os.cpu_count(),
+        'python': sys.version.split()[0],
+        'stages': [],
+    }
+    try:
+        for stage in scenario['stages']:
+            duration = args.stage_duration or stage['duration']
+            pids = server.worker_pids()
+            for pid in pids:
+                reset_peak_rss(pid)
+
+            start = time.monotonic()
+            records = run_stage(server.base_url, scenario, files, stage['concurrency'], duration, args.timeout)
+            elapsed = time.monotonic() - start
+
+            by_operation = {}
+            for record in records:
+                by_operation.setdefault(record['operation'], []).append(record)
+            peak_rss = {}
+            for pid in pids:
+                kb = read_status_kb(pid, 'VmHWM')
+                if kb is not None:
+                    peak_rss[str(pid)] = round(kb / 1024, 1)
+
+            stage_result = {
+                'concurrency': stage['concurrency'],
+                'duration': round(elapsed, 2),
+                'total': summarize(records, elapsed),
+                'operations': {name: summarize(items, elapsed) for name, items in sorted(by_operation.items())},
+                'peak_rss_mb': peak_rss,
+            }
+            result['stages'].append(stage_result)
+            print_stage(stage_result)
+    finally:
+        server.stop()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(
+        args.output_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{result['revision']}.json")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 结果已保存: {output_path}")
+
+    if previous is not None:
+        print_comparison(result, previous)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
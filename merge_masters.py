@@ -0,0 +1,157 @@
+"""
+Excel批量操作工具箱 - 增量合并的主表存储
+保存合并多个文件的结果（列式格式：可用时为Parquet，否则为pickle）以及参与合并的文件清单，
+再次合并时已合并过的文件不再解析，只追加新增的文件
+Author: StanleyChanH
+License: MIT
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+
+
+def compute_master_key(name, params):
+    """由合并任务名称和影响合并结果的参数计算主表ID"""
+    payload = json.dumps([name, params], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MasterStore:
+    """
+    基于本地目录的主表存储
+    每个主表由清单 <id>.json 和数据文件 <id>.<版本>.parquet（或 .pkl）组成
+    数据文件每次保存都使用新的文件名，清单替换后再删除旧文件，读取时不会读到写了一半的数据
+    过期时间从清单文件的修改时间算起，每次读取或保存都会重新计时
+    """
+
+    def __init__(self, root, ttl_seconds):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _manifest_path(self, key):
+        return os.path.join(self.root, f'{key}.json')
+
+    def _read_manifest(self, key):
+        try:
+            with open(self._manifest_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _is_expired(self, key, now):
+        try:
+            return now - os.path.getmtime(self._manifest_path(key)) > self.ttl_seconds
+        except OSError:
+            return True
+
+    def load(self, key):
+        """读取主表，返回(DataFrame, 输入清单)；不存在、已过期或无法读取时返回None"""
+        import pandas as pd
+
+        manifest = self._read_manifest(key)
+        if manifest is None or self._is_expired(key, time.time()):
+            return None
+
+        data_path = os.path.join(self.root, manifest['data'])
+        try:
+            if manifest['format'] == 'parquet':
+                df = pd.read_parquet(data_path)
+            else:
+                df = pd.read_pickle(data_path)
+        except (OSError, ValueError, ImportError):
+            return None
+
+        # 只更新清单的修改时间而不重写清单，不会覆盖其他请求同时保存的新清单
+        try:
+            os.utime(self._manifest_path(key))
+        except OSError:
+            pass
+        return df, manifest['inputs']
+
+    def save(self, key, df, inputs):
+        """保存主表和输入清单（[文件名, SHA-256]列表），返回使用的存储格式"""
+        self.cleanup()
+        version = uuid.uuid4().hex[:12]
+
+        # 优先使用Parquet；未安装pyarrow或列中混有无法转换的类型时改用pickle
+        data_name = f'{key}.{version}.parquet'
+        try:
+            self._atomic_write(data_name, lambda path: df.to_parquet(path, index=False))
+            data_format = 'parquet'
+        except (ImportError, ValueError, TypeError, NotImplementedError):
+            data_name = f'{key}.{version}.pkl'
+            self._atomic_write(data_name, df.to_pickle)
+            data_format = 'pickle'
+
+        previous = self._read_manifest(key)
+        manifest = {
+            'data': data_name,
+            'format': data_format,
+            'inputs': inputs,
+            'rows': len(df),
+            'updated_at': time.time(),
+        }
+        self._atomic_write(
+            os.path.basename(self._manifest_path(key)),
+            lambda path: self._write_json(path, manifest),
+        )
+
+        if previous is not None and previous['data'] != data_name:
+            self._unlink(previous['data'])
+        return data_format
+
+    @staticmethod
+    def _write_json(path, content):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(content, f, ensure_ascii=False)
+
+    def _atomic_write(self, name, write):
+        """调用write(临时路径)写入后重命名为name"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        os.close(fd)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, os.path.join(self.root, name))
+        except BaseException:
+            self._unlink(os.path.basename(tmp_path))
+            raise
+
+    def _unlink(self, name):
+        try:
+            os.unlink(os.path.join(self.root, name))
+        except OSError:
+            pass
+
+    def cleanup(self):
+        """删除过期的主表，以及不再被任何清单引用的数据文件"""
+        with self._lock:
+            now = time.time()
+            names = os.listdir(self.root)
+            referenced = set()
+            for name in names:
+                if not name.endswith('.json'):
+                    continue
+                manifest = self._read_manifest(name[:-5])
+                if manifest is None:
+                    continue
+                if self._is_expired(name[:-5], now):
+                    self._unlink(name)
+                    self._unlink(manifest['data'])
+                else:
+                    referenced.add(manifest['data'])
+
+            # 其他进程可能正在写入，只删除一小时前的未引用文件
+            for name in names:
+                if name.endswith(('.parquet', '.pkl', '.tmp')) and name not in referenced:
+                    try:
+                        if now - os.path.getmtime(os.path.join(self.root, name)) > 3600:
+                            self._unlink(name)
+                    except OSError:
+                        pass
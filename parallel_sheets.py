@@ -0,0 +1,57 @@
+"""
+Excel批量操作工具箱 - 工作簿内的并行sheet解析
+把一个xlsx的各个sheet分给多个工作进程，每个进程打开同一个临时文件，只解析分配给它的sheet
+Author: StanleyChanH
+License: MIT
+"""
+
+import zipfile
+
+from xlsx_stream import workbook_sheets
+
+
+def sheet_sizes(path):
+    """按工作簿顺序返回(sheet名, sheet XML解压后的字节数)列表，用于估算各sheet的解析量"""
+    with zipfile.ZipFile(path) as zip_file:
+        return [(name, zip_file.getinfo(part).file_size) for name, part in workbook_sheets(zip_file)]
+
+
+def assign_sheets(sizes, workers):
+    """
+    把sheet序号分成最多workers组，各组的总大小尽量接近（从大到小依次分给当前最轻的组）
+    每组内保持原顺序
+    """
+    groups = [[] for _ in range(min(workers, len(sizes)))]
+    loads = [0] * len(groups)
+    for index in sorted(range(len(sizes)), key=lambda i: sizes[i], reverse=True):
+        lightest = loads.index(min(loads))
+        groups[lightest].append(index)
+        loads[lightest] += sizes[index]
+    return [sorted(group) for group in groups if group]
+
+
+def parse_sheets(path, sheet_names, engine='openpyxl'):
+    """（在工作进程中运行）只解析指定的sheet，按给定顺序返回DataFrame列表"""
+    import pandas as pd
+
+    frames = pd.read_excel(path, sheet_name=list(sheet_names), engine=engine)
+    return [frames[name] for name in sheet_names]
+
+
+def read_sheets_parallel(executor, path, sheets, workers, engine='openpyxl'):
+    """
+    用进程池并行解析sheet，sheets为sheet_sizes()的结果
+    按原sheet顺序返回(sheet名, DataFrame)列表
+    """
+    names = [name for name, _ in sheets]
+    groups = assign_sheets([size for _, size in sheets], workers)
+    futures = [
+        (group, executor.submit(parse_sheets, path, [names[i] for i in group], engine))
+        for group in groups
+    ]
+
+    frames = [None] * len(names)
+    for group, future in futures:
+        for index, df in zip(group, future.result()):
+            frames[index] = df
+    return list(zip(names, frames))
@@ -0,0 +1,91 @@
+"""
+Excel批量操作工具箱 - 请求性能分析
+保存单个请求的cProfile结果及请求元数据（操作、输入大小、行数），供管理接口列出和下载
+Author: StanleyChanH
+License: MIT
+"""
+
+import io
+import os
+import re
+import json
+import uuid
+import pstats
+import threading
+from datetime import datetime
+
+_PROFILE_ID_PATTERN = re.compile(r'^\d{8}_\d{6}_[0-9a-f]{8}$')
+
+
+def is_valid_profile_id(profile_id):
+    """检查性能分析ID格式，防止路径穿越"""
+    return bool(_PROFILE_ID_PATTERN.match(profile_id))
+
+
+class ProfileStore:
+    """
+    基于本地目录的性能分析结果存储，只保留最近max_count个
+    每个结果由 <id>.prof（pstats格式）和 <id>.json（元数据）组成
+    """
+
+    def __init__(self, root, max_count):
+        self.root = root
+        self.max_count = max_count
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def profile_path(self, profile_id):
+        return os.path.join(self.root, f'{profile_id}.prof')
+
+    def _meta_path(self, profile_id):
+        return os.path.join(self.root, f'{profile_id}.json')
+
+    def save(self, profiler, meta, top=20):
+        """保存性能分析结果，元数据中附带按累计耗时排序的前top个函数，返回结果ID"""
+        profile_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(top)
+        meta = dict(meta, id=profile_id, summary=summary.getvalue())
+
+        profiler.dump_stats(self.profile_path(profile_id))
+        with open(self._meta_path(profile_id), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        self._evict()
+        return profile_id
+
+    def get(self, profile_id):
+        """读取元数据，不存在时返回None"""
+        if not is_valid_profile_id(profile_id):
+            return None
+        try:
+            with open(self._meta_path(profile_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list(self):
+        """按时间倒序列出所有结果的元数据（不含文本摘要）"""
+        profile_ids = sorted(
+            (name[:-5] for name in os.listdir(self.root) if name.endswith('.json')),
+            reverse=True,
+        )
+        result = []
+        for profile_id in profile_ids:
+            meta = self.get(profile_id)
+            if meta is not None:
+                meta.pop('summary', None)
+                result.append(meta)
+        return result
+
+    def _evict(self):
+        """删除超出数量上限的最早结果（ID以时间开头，按名称排序即按时间排序）"""
+        with self._lock:
+            profile_ids = sorted(name[:-5] for name in os.listdir(self.root) if name.endswith('.json'))
+            for profile_id in profile_ids[:max(0, len(profile_ids) - self.max_count)]:
+                for path in (self._meta_path(profile_id), self.profile_path(profile_id)):
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
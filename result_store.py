@@ -0,0 +1,149 @@
+"""
+Excel批量操作工具箱 - 结果存储
+将处理结果保存在本地磁盘上，按稳定的ID提供下载，并按大小和过期时间自动清理
+Author: StanleyChanH
+License: MIT
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+
+def compute_result_id(operation, params, input_hashes, version=''):
+    """
+    根据操作名、参数和输入文件哈希计算结果ID，相同请求得到相同的ID
+    version为处理代码和配置的版本，版本变化后相同的请求得到新的ID
+    """
+    payload = json.dumps(
+        {'operation': operation, 'params': params, 'inputs': input_hashes, 'version': version},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def is_valid_result_id(result_id):
+    """检查结果ID格式（64位十六进制），防止路径穿越"""
+    return len(result_id) == 64 and all(c in '0123456789abcdef' for c in result_id)
+
+
+class ResultStore:
+    """
+    基于本地目录的结果存储
+    每个结果由数据文件 <id>.bin 和元数据文件 <id>.json 组成
+    """
+
+    def __init__(self, root, max_bytes, ttl_seconds):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _data_path(self, result_id):
+        return os.path.join(self.root, f'{result_id}.bin')
+
+    def _meta_path(self, result_id):
+        return os.path.join(self.root, f'{result_id}.json')
+
+    def get(self, result_id):
+        """读取结果元数据，不存在或已过期时返回None"""
+        if not is_valid_result_id(result_id):
+            return None
+
+        meta_path = self._meta_path(result_id)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - meta['created_at'] > self.ttl_seconds or not os.path.exists(meta['path']):
+            self.delete(result_id)
+            return None
+
+        # 更新访问时间，淘汰时优先删除最久未访问的结果
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return meta
+
+    def put(self, result_id, data, download_name, mimetype):
+        """
+        保存结果（data为BytesIO），返回元数据
+        单个结果超过存储上限时不保存，返回None
+        """
+        # 直接写入BytesIO的内存视图，不复制结果内容
+        with data.getbuffer() as content:
+            if len(content) > self.max_bytes:
+                return None
+
+            meta = {
+                'id': result_id,
+                'path': self._data_path(result_id),
+                'size': len(content),
+                'etag': hashlib.sha256(content).hexdigest(),
+                'download_name': download_name,
+                'mimetype': mimetype,
+                'created_at': time.time(),
+            }
+
+            # 先写入临时文件再重命名，避免并发读取到不完整的结果
+            self._atomic_write(meta['path'], content)
+        self._atomic_write(self._meta_path(result_id), json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+        self.evict()
+        return meta
+
+    def _atomic_write(self, path, content):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def delete(self, result_id):
+        """删除结果"""
+        for path in (self._meta_path(result_id), self._data_path(result_id)):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def evict(self):
+        """删除过期结果，并按最久未访问的顺序删除结果直到总大小不超过上限"""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for name in os.listdir(self.root):
+                if not name.endswith('.json'):
+                    continue
+                result_id = name[:-5]
+                meta_path = self._meta_path(result_id)
+                try:
+                    with open(meta_path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                    last_access = os.path.getmtime(meta_path)
+                except (OSError, ValueError):
+                    continue
+
+                if now - meta['created_at'] > self.ttl_seconds:
+                    self.delete(result_id)
+                else:
+                    entries.append((last_access, result_id, meta['size']))
+
+            total = sum(size for _, _, size in entries)
+            for _, result_id, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self.delete(result_id)
+                total -= size
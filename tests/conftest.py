@@ -0,0 +1,58 @@
+"""
+测试公共配置：每个测试使用独立的临时目录，并提供生成Excel/CSV文件的辅助函数
+"""
+
+import io
+
+import pandas as pd
+import pytest
+
+from app import app as flask_app
+
+# 按需创建的服务，测试之间不共享
+SERVICES = ('result_store', 'upload_store', 'master_store', 'admission', 'profile_store')
+
+
+@pytest.fixture
+def app(tmp_path):
+    flask_app.config.update(
+        TESTING=True,
+        UPLOAD_TEMP_DIR=str(tmp_path / 'uploads'),
+        RESULT_STORE_DIR=str(tmp_path / 'results'),
+        UPLOAD_STORE_DIR=str(tmp_path / 'chunked_uploads'),
+        PROFILE_DIR=str(tmp_path / 'profiles'),
+        MERGE_MASTER_DIR=str(tmp_path / 'merge_masters'),
+    )
+    for name in SERVICES:
+        flask_app.extensions.pop(name, None)
+    yield flask_app
+    for name in SERVICES:
+        flask_app.extensions.pop(name, None)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def xlsx_bytes(df, sheet_name='Sheet1'):
+    """DataFrame转为xlsx文件内容"""
+    output = io.BytesIO()
+    df.to_excel(output, index=False, sheet_name=sheet_name)
+    return output.getvalue()
+
+
+def csv_bytes(df):
+    """DataFrame转为CSV文件内容"""
+    return df.to_csv(index=False).encode('utf-8')
+
+
+def upload(content, filename):
+    """测试客户端的上传文件字段值"""
+    return (io.BytesIO(content), filename)
+
+
+def read_xlsx(response):
+    """读取响应中的xlsx结果"""
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return pd.read_excel(io.BytesIO(response.data))
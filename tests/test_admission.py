@@ -0,0 +1,79 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from admission import MIN_REQUEST_COST, AdmissionController, AdmissionRejected
+from app import get_admission_controller
+from conftest import upload, xlsx_bytes
+
+
+def test_cost_estimate_is_bounded():
+    controller = AdmissionController(memory_budget=10 * MIN_REQUEST_COST)
+    assert controller.estimate_cost('merge_files', 1) == MIN_REQUEST_COST
+    assert controller.estimate_cost('merge_files', 100 * MIN_REQUEST_COST) == 10 * MIN_REQUEST_COST
+
+
+def test_concurrency_limit_queues_then_admits():
+    controller = AdmissionController(100, {'merge_files': 1}, queue_timeout=5)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with controller.admit('merge_files', 1):
+            entered.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    entered.wait()
+    threading.Timer(0.1, release.set).start()
+    with controller.admit('merge_files', 1):
+        assert controller.stats()['operations']['merge_files']['active'] == 1
+    thread.join()
+
+    stats = controller.stats()
+    assert stats['memory_in_use'] == 0
+    assert stats['peak_queue_depth'] == 1
+    assert stats['operations']['merge_files']['admitted'] == 2
+
+
+def test_memory_budget_rejects_after_timeout_or_full_queue():
+    controller = AdmissionController(100, queue_timeout=0.05, max_queue_depth=0)
+    with controller.admit('a', 80):
+        with pytest.raises(AdmissionRejected) as info:
+            with controller.admit('b', 30):
+                pass
+    assert info.value.retry_after >= 1
+    assert controller.stats()['operations']['b']['rejected'] == 1
+
+    controller = AdmissionController(100, queue_timeout=0.05)
+    with controller.admit('a', 80):
+        with pytest.raises(AdmissionRejected):
+            with controller.admit('b', 30):
+                pass
+
+
+def test_busy_server_returns_503(client, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'ADMISSION_CONCURRENCY', {'merge_files': 1})
+    monkeypatch.setitem(app.config, 'ADMISSION_QUEUE_TIMEOUT', 0.05)
+    with app.app_context():
+        controller = get_admission_controller()
+
+    # 占用merge_files唯一的并发名额
+    with controller.admit('merge_files', 1):
+        response = client.post('/api/merge-files', data={
+            'files': [upload(xlsx_bytes(pd.DataFrame({'a': [1]})), 'a.xlsx')]})
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) >= 1
+
+    stats = client.get('/api/admission-stats').get_json()
+    assert stats['operations']['merge_files']['rejected'] == 1
+
+
+def test_budget_is_split_between_workers(client, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'ADMISSION_MEMORY_BUDGET', 8 * MIN_REQUEST_COST)
+    monkeypatch.setitem(app.config, 'SERVER_WORKERS', 4)
+    stats = client.get('/api/admission-stats').get_json()
+    assert stats['memory_budget'] == 2 * MIN_REQUEST_COST
+    assert stats['server_workers'] == 4
@@ -0,0 +1,86 @@
+import os
+
+import pandas as pd
+
+from batch import main
+
+
+def write_xlsx(path, df):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_excel(path, index=False)
+
+
+def run(*argv):
+    return main([str(arg) for arg in argv] + ['-j', '1'])
+
+
+def test_same_file_names_in_different_folders(tmp_path):
+    write_xlsx(tmp_path / 'in' / 'a' / 'data.xlsx', pd.DataFrame({'x': [1], '工资': [10]}))
+    write_xlsx(tmp_path / 'in' / 'b' / 'data.xlsx', pd.DataFrame({'x': [2], '工资': [20]}))
+    out = tmp_path / 'out'
+
+    assert run('delete_columns', tmp_path / 'in', '-o', out, '--columns', '工资') == 0
+    assert pd.read_excel(out / 'a' / '删除列_data.xlsx')['x'].tolist() == [1]
+    assert pd.read_excel(out / 'b' / '删除列_data.xlsx')['x'].tolist() == [2]
+
+    # 分别指定时相对路径相同，拒绝处理
+    assert run('delete_columns', tmp_path / 'in' / 'a' / 'data.xlsx', tmp_path / 'in' / 'b' / 'data.xlsx',
+               '-o', tmp_path / 'out2', '--columns', '工资') == 2
+    assert not (tmp_path / 'out2').exists()
+
+
+def test_modified_output_is_regenerated(tmp_path, capsys):
+    write_xlsx(tmp_path / 'in' / 'data.xlsx', pd.DataFrame({'x': [1], '工资': [10]}))
+    out = tmp_path / 'out'
+    argv = ['delete_columns', tmp_path / 'in', '-o', out, '--columns', '工资']
+
+    assert run(*argv) == 0
+    assert run(*argv) == 0
+    assert '已是最新' in capsys.readouterr().out
+
+    (out / '删除列_data.xlsx').write_bytes(b'overwritten')
+    assert run(*argv) == 0
+    assert '已是最新' not in capsys.readouterr().out
+    assert pd.read_excel(out / '删除列_data.xlsx').columns.tolist() == ['x']
+
+
+def test_merge_and_filter_write_one_output(tmp_path):
+    write_xlsx(tmp_path / 'in' / 'a.xlsx', pd.DataFrame({'部门': ['销售部', '技术部']}))
+    write_xlsx(tmp_path / 'in' / 'sub' / 'b.xlsx', pd.DataFrame({'部门': ['销售部']}))
+    out = tmp_path / 'out'
+
+    assert run('merge_files', tmp_path / 'in', '-o', out, '--no-keep-headers', '--add-source-column') == 0
+    merged = pd.read_excel(out / '合并结果.xlsx')
+    assert merged['部门'].tolist() == ['销售部', '技术部', '销售部']
+    assert merged['来源文件'].tolist() == ['a.xlsx', 'a.xlsx', os.path.join('sub', 'b.xlsx')]
+
+    assert run('filter_data', tmp_path / 'in', '-o', out,
+               '--column-name', '部门', '--condition', '等于', '--value', '销售部') == 0
+    assert len(pd.read_excel(out / '筛选结果.xlsx')) == 2
+
+
+def test_split_by_column_respects_fan_out_limit(tmp_path):
+    write_xlsx(tmp_path / 'in' / 'data.xlsx', pd.DataFrame({'部门': ['销售部', '技术部', '财务部']}))
+    out = tmp_path / 'out'
+
+    assert run('split_by_column', tmp_path / 'in', '-o', out, '--column-name', '部门', '--max-parts', 2) == 1
+    assert run('split_by_column', tmp_path / 'in', '-o', out, '--column-name', '部门') == 0
+    assert sorted(os.listdir(out / 'data')) == ['技术部.xlsx', '财务部.xlsx', '销售部.xlsx']
+
+
+def test_conflicts_follow_output_names(tmp_path):
+    df = pd.DataFrame({'x': [1], '工资': [10]})
+    write_xlsx(tmp_path / 'in' / 'data.xlsx', df)
+    df.to_csv(tmp_path / 'in' / 'data.csv', index=False)
+    out = tmp_path / 'out'
+
+    # 输出保留扩展名，不冲突
+    assert run('delete_columns', tmp_path / 'in', '-o', out, '--columns', '工资') == 0
+    assert sorted(os.listdir(out)) == ['.excel_toolkit_manifest.json', '删除列_data.csv', '删除列_data.xlsx']
+
+    # 格式转换只处理CSV，xlsx被忽略
+    assert run('convert_format', tmp_path / 'in', '-o', tmp_path / 'converted', '--convert-type', 'csv_to_xlsx') == 0
+    assert pd.read_excel(tmp_path / 'converted' / 'data.xlsx')['工资'].tolist() == [10]
+
+    # 拆分结果都写入data/目录，冲突
+    assert run('split_by_rows', tmp_path / 'in', '-o', tmp_path / 'split', '--rows-per-file', 1) == 2
@@ -0,0 +1,98 @@
+import hashlib
+import io
+
+import pandas as pd
+import pytest
+
+from chunked_uploads import UploadError, UploadStore, UploadStoreFull
+from conftest import xlsx_bytes
+
+CHUNK = 4
+
+
+def make_store(tmp_path, max_total_bytes=1024, max_sessions=10):
+    return UploadStore(str(tmp_path), CHUNK, 100, 60, max_total_bytes, max_sessions)
+
+
+def chunk_hashes(content):
+    return [hashlib.sha256(content[i:i + CHUNK]).hexdigest() for i in range(0, max(len(content), 1), CHUNK)]
+
+
+def test_chunks_in_any_order_assemble_the_file(tmp_path):
+    store = make_store(tmp_path)
+    content = b'0123456789'
+    started = store.start('a.csv', len(content), CHUNK, chunk_hashes(content))
+    upload_id = started['upload_id']
+    assert started['missing'] == [0, 1, 2]
+
+    store.write_chunk(upload_id, 2, io.BytesIO(content[8:]))
+    store.write_chunk(upload_id, 0, io.BytesIO(content[:4]))
+    with pytest.raises(UploadError):
+        store.complete(upload_id)
+
+    # 中断后重新开始，只需要上传缺失的块
+    assert store.start('a.csv', len(content), CHUNK, chunk_hashes(content))['missing'] == [1]
+    store.write_chunk(upload_id, 1, io.BytesIO(content[4:8]))
+    meta = store.complete(upload_id)
+    assert open(meta['path'], 'rb').read() == content
+
+    # 相同内容再次上传时直接完成
+    assert store.start('b.csv', len(content), CHUNK, chunk_hashes(content))['complete'] is True
+
+
+def test_corrupted_or_oversized_chunk_is_rejected(tmp_path):
+    store = make_store(tmp_path)
+    content = b'abcdefgh'
+    upload_id = store.start('a.csv', len(content), CHUNK, chunk_hashes(content))['upload_id']
+
+    with pytest.raises(UploadError, match='校验失败'):
+        store.write_chunk(upload_id, 0, io.BytesIO(b'abcx'))
+    with pytest.raises(UploadError, match='大小不正确'):
+        store.write_chunk(upload_id, 1, io.BytesIO(b'efghi'))
+    with pytest.raises(UploadError, match='无效的分块序号'):
+        store.write_chunk(upload_id, 2, io.BytesIO(b''))
+    assert store.status(upload_id)['missing'] == [0, 1]
+
+
+def test_total_size_and_session_limits(tmp_path):
+    store = make_store(tmp_path, max_total_bytes=20, max_sessions=2)
+    first, second, third = b'a' * 12, b'b' * 12, b'c' * 4
+
+    store.start('1.csv', len(first), CHUNK, chunk_hashes(first))
+    with pytest.raises(UploadStoreFull):
+        store.start('2.csv', len(second), CHUNK, chunk_hashes(second))
+
+    store.start('3.csv', len(third), CHUNK, chunk_hashes(third))
+    with pytest.raises(UploadStoreFull):
+        store.start('4.csv', 1, CHUNK, chunk_hashes(b'd'))
+    assert store.usage() == (16, 2)
+
+
+def test_upload_api_and_reference_from_route(client, app):
+    content = xlsx_bytes(pd.DataFrame({'a': [1, 2, 3]}))
+    size = app.config['UPLOAD_CHUNK_SIZE']
+    hashes = [hashlib.sha256(content[i:i + size]).hexdigest() for i in range(0, len(content), size)]
+
+    started = client.post('/api/uploads', json={
+        'filename': 'a.xlsx', 'size': len(content), 'chunk_size': size, 'chunk_hashes': hashes,
+    }).get_json()
+    upload_id = started['upload_id']
+    for index in started['missing']:
+        assert client.put(f'/api/uploads/{upload_id}/chunks/{index}',
+                          data=content[index * size:(index + 1) * size]).status_code == 200
+    assert client.post(f'/api/uploads/{upload_id}/complete').get_json()['complete'] is True
+
+    response = client.post('/api/row-estimate', data={'operation': 'merge_files', 'upload_ids': upload_id})
+    assert response.get_json()['rows'] == 3
+
+
+def test_full_store_returns_503(client, app):
+    app.config['UPLOAD_MAX_SESSIONS'] = 0
+    try:
+        response = client.post('/api/uploads', json={
+            'filename': 'a.xlsx', 'size': 1, 'chunk_size': app.config['UPLOAD_CHUNK_SIZE'],
+            'chunk_hashes': [hashlib.sha256(b'a').hexdigest()],
+        })
+    finally:
+        app.config['UPLOAD_MAX_SESSIONS'] = 20
+    assert response.status_code == 503
@@ -0,0 +1,101 @@
+import io
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+from column_profile import HeavyHitters, HyperLogLog, TableProfile
+from conftest import csv_bytes, upload, xlsx_bytes
+
+
+@pytest.mark.parametrize('distinct', [10, 1000, 200000])
+def test_hyperloglog_estimate_is_close(distinct):
+    hll = HyperLogLog()
+    values = pd.Series(np.arange(distinct)).astype(str)
+    for start in range(0, distinct, 50000):
+        hll.add(values.iloc[start:start + 50000])
+    hll.add(values.iloc[:distinct // 2])  # 重复的值不影响估计
+    assert abs(hll.estimate() - distinct) <= max(2, distinct * 0.03)
+
+
+def test_heavy_hitters_exact_below_capacity():
+    hitters = HeavyHitters(capacity=10)
+    hitters.add(pd.Series(['a', 'b', 'a']))
+    hitters.add(pd.Series(['a', 'c']))
+    assert hitters.exact
+    assert hitters.top(1) == [('a', 3)]
+    assert dict(hitters.top(3)) == {'a': 3, 'b': 1, 'c': 1}
+
+
+def test_heavy_hitters_error_bound_above_capacity():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([np.full(5000, -1), np.full(3000, -2), rng.integers(0, 100000, 20000)])
+    rng.shuffle(values)
+    capacity = 50
+    hitters = HeavyHitters(capacity=capacity)
+    for chunk in np.array_split(values, 20):
+        hitters.add(pd.Series(chunk))
+
+    assert not hitters.exact
+    assert len(hitters.counts) <= capacity
+    top = dict(hitters.top(2))
+    # Misra-Gries的计数不会多算，少算的量不超过 n/(capacity+1)
+    bound = len(values) / (capacity + 1)
+    assert 5000 - bound <= top[-1] <= 5000
+    assert 3000 - bound <= top[-2] <= 3000
+
+
+def test_table_profile_merges_columns_across_chunks():
+    profile = TableProfile()
+    profile.add(pd.DataFrame({'a': [1, 2, None], 'b': ['x', 'y', 'x']}))
+    profile.add(pd.DataFrame({'a': [2.5, 4], 'c': [True, False]}))
+    result = profile.to_dict(top_k=1)
+    columns = {column['name']: column for column in result['columns']}
+
+    assert result['rows'] == 5
+    assert columns['a']['type'] == 'float'
+    assert (columns['a']['count'], columns['a']['nulls']) == (4, 1)
+    assert (columns['a']['min'], columns['a']['max']) == (1, 4)
+    assert columns['a']['distinct'] == 4 and columns['a']['distinct_exact']
+    assert columns['b']['top'] == [{'value': 'x', 'count': 2}]
+    assert columns['c']['type'] == 'boolean'
+
+
+def test_profile_endpoint_with_duplicate_headers(client):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(['a', 'a', 'b'])
+    ws.append([1, 'x', 3])
+    ws.append([2, 'y', None])
+    content = io.BytesIO()
+    wb.save(content)
+
+    response = client.post('/api/profile', data={
+        'files': [upload(content.getvalue(), 'dup.xlsx'), upload(csv_bytes(pd.DataFrame({'a': [3]})), 'b.csv')],
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    columns = {column['name']: column for column in response.get_json()['columns']}
+    assert list(columns) == ['a', 'a.1', 'b']
+    assert columns['a']['count'] == 3
+    assert columns['a.1']['type'] == 'string'
+    assert columns['b']['nulls'] == 1
+
+
+def test_split_by_column_fan_out_guard(client, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SPLIT_CONFIRM_PARTS', 2)
+    monkeypatch.setitem(app.config, 'SPLIT_MAX_PARTS', 4)
+    content = xlsx_bytes(pd.DataFrame({'部门': ['a', 'b', 'c']}))
+
+    def split(column_values=None, **form):
+        data = column_values or content
+        return client.post('/api/split-by-column', data={
+            'file': upload(data, 'a.xlsx'), 'column_name': '部门', **form})
+
+    response = split()
+    assert response.status_code == 409
+    assert response.get_json()['confirm_required'] is True
+    assert split(confirm='true').status_code == 200
+
+    too_many = xlsx_bytes(pd.DataFrame({'部门': list('abcde')}))
+    assert split(too_many, confirm='true').status_code == 400
@@ -0,0 +1,79 @@
+import codecs
+
+import pandas as pd
+import pytest
+
+from csv_reader import SNIFF_BYTES, count_csv_rows, iter_csv_chunks, read_csv_file, sniff_csv
+
+SAMPLE = '姓名;部门;金额\n张三;销售部;1200.5\n李四;技术部;800\n'
+
+
+@pytest.mark.parametrize('encoding, prefix, expected', [
+    ('utf-8', b'', 'utf-8'),
+    ('utf-8', codecs.BOM_UTF8, 'utf-8-sig'),
+    ('gbk', b'', 'gb18030'),
+])
+def test_sniff_encoding_and_delimiter(encoding, prefix, expected):
+    assert sniff_csv(prefix + SAMPLE.encode(encoding)) == (expected, ';')
+
+
+def test_prefix_cut_inside_multibyte_character():
+    content = ('a,b\n' + '中文,1\n' * 10).encode('utf-8')
+    assert sniff_csv(content[:-4])[0] == 'utf-8'
+
+
+@pytest.mark.parametrize('delimiter', [',', ';', '\t', '|'])
+def test_read_gbk_with_any_delimiter(tmp_path, delimiter):
+    path = tmp_path / 'data.csv'
+    path.write_bytes(SAMPLE.replace(';', delimiter).encode('gbk'))
+    df = read_csv_file(str(path), engine='pandas')
+    assert df.columns.tolist() == ['姓名', '部门', '金额']
+    assert df['金额'].tolist() == [1200.5, 800]
+
+
+@pytest.mark.parametrize('content', [
+    b'a,b\nTrue,1\n,2\nFalse,3\n',
+    b'a,b,c\n',
+    b'a,b\n1,\n2,\n',
+    b'd,t\n2024-01-02,x\n2024-02-03,y\n',
+    b'a,b\n1,"multi\nline"\nNA,null\n',
+    b'a,a\n1,2\n',
+    b'a,b,\n1,2,\n',
+    b'a,b\n12345678901234567890,1\n1,2\n',
+    b'a,b\n9223372036854775808,1\n',
+    b'a,b\n0x10,1\n1,2\n',
+])
+def test_pyarrow_matches_pandas(tmp_path, content):
+    pytest.importorskip('pyarrow')
+    path = tmp_path / 'data.csv'
+    path.write_bytes(content)
+    pd.testing.assert_frame_equal(read_csv_file(str(path), engine='pyarrow'),
+                                  read_csv_file(str(path), engine='pandas'))
+
+
+@pytest.mark.parametrize('engine', ['auto', 'pandas'])
+def test_multibyte_text_after_sniffed_prefix(tmp_path, engine):
+    path = tmp_path / 'data.csv'
+    rows = SNIFF_BYTES // 4 + 10
+    path.write_bytes(('a,b\n' + 'x,1\n' * rows + '张三,2\n').encode('gbk'))
+    df = read_csv_file(str(path), engine=engine)
+    assert len(df) == rows + 1
+    assert df.iloc[-1].tolist() == ['张三', 2]
+
+    chunks = list(iter_csv_chunks(str(path), 5000))
+    assert sum(len(chunk) for chunk in chunks) == rows + 1
+    assert chunks[-1].index[-1] == rows
+    assert chunks[-1].iloc[-1].tolist() == ['张三', 2]
+
+
+def test_count_rows_and_chunks(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_bytes(('x|y\n' + ''.join(f'{i}|{i}\n' for i in range(25))).encode('utf-8'))
+    assert count_csv_rows(str(path)) == 25
+
+    path.write_bytes(path.read_bytes().rstrip(b'\n'))
+    assert count_csv_rows(str(path)) == 25
+
+    chunks = list(iter_csv_chunks(str(path), 10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert chunks[0].columns.tolist() == ['x', 'y']
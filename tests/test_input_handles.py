@@ -0,0 +1,67 @@
+import hashlib
+import os
+import zipfile
+
+import pytest
+
+import app as app_module
+from app import StoredUpload, get_input_handle
+from conftest import upload
+from input_handles import TEMP_PREFIX, InputHandle
+
+
+def test_handle_reads_file_through_mmap(tmp_path):
+    path = tmp_path / 'a.xlsx'
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr('xl/workbook.xml', '<workbook/>')
+
+    handle = InputHandle(str(path), 'a.xlsx', delete=False)
+    assert handle.sha256 == hashlib.sha256(path.read_bytes()).hexdigest()
+    with handle.zip_view() as zf:
+        assert zf.read('xl/workbook.xml') == b'<workbook/>'
+
+
+def test_empty_file_has_clear_errors(tmp_path):
+    path = tmp_path / 'empty.xlsx'
+    path.write_bytes(b'')
+    handle = InputHandle(str(path), 'empty.xlsx', delete=False)
+
+    assert handle.sha256 == hashlib.sha256(b'').hexdigest()
+    with pytest.raises(ValueError, match='为空'):
+        handle.mmap()
+    with pytest.raises(zipfile.BadZipFile, match='为空'):
+        with handle.zip_view():
+            pass
+
+
+def test_stored_uploads_share_one_handle(app, tmp_path):
+    path = tmp_path / 'stored.bin'
+    path.write_bytes(b'abc')
+    with app.test_request_context():
+        first = get_input_handle(StoredUpload(str(path), 'a.csv'))
+        assert get_input_handle(StoredUpload(str(path), 'a.csv')) is first
+        assert get_input_handle(StoredUpload(str(path), 'b.csv')) is not first
+    assert path.exists()
+
+
+@pytest.mark.parametrize('url, data', [
+    ('/api/row-estimate', {'operation': 'merge_files'}),
+    ('/api/find-replace', {'find_text': 'a', 'engine': 'inplace'}),
+])
+def test_empty_xlsx_is_a_client_error(client, url, data):
+    response = client.post(url, data={'files': [upload(b'', 'empty.xlsx')], **data})
+    assert response.status_code == 400
+    assert 'empty.xlsx' in response.get_json()['error']
+
+
+def test_stale_uploads_swept_once_per_process(client, app, monkeypatch):
+    os.makedirs(app.config['UPLOAD_TEMP_DIR'], exist_ok=True)
+    # 不存在的进程（PID超出范围）遗留的临时文件
+    stale = os.path.join(app.config['UPLOAD_TEMP_DIR'], f'{TEMP_PREFIX}999999999_leftover')
+    open(stale, 'wb').close()
+
+    # 模拟由预加载的主进程fork出来的worker：主进程已经清理过
+    monkeypatch.setattr(app_module, '_stale_sweep_pid', -1)
+    client.post('/api/row-estimate', data={'files': [upload(b'a,b\n1,2\n', 'a.csv')]})
+    assert not os.path.exists(stale)
+    assert app_module._stale_sweep_pid == os.getpid()
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code, **env):
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True,
+        env={**os.environ, **env}, check=True,
+    )
+    return result.stdout.split()
+
+
+CHECK = '''
+import sys
+import app
+app.app.test_client().get('/')
+print('pandas' in sys.modules, 'openpyxl' in sys.modules)
+'''
+
+
+def test_home_page_does_not_import_data_stack():
+    assert run_python(CHECK, EXCEL_TOOLKIT_PRELOAD='') == ['False', 'False']
+
+
+def test_preload_imports_data_stack():
+    assert run_python(CHECK, EXCEL_TOOLKIT_PRELOAD='1') == ['True', 'True']
@@ -0,0 +1,104 @@
+import io
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import app as app_module
+from conftest import read_xlsx, upload, xlsx_bytes
+from merge_masters import MasterStore
+
+FILES = {
+    name: xlsx_bytes(pd.DataFrame({'月份': [name] * 3, '金额': [i, i + 1, i + 2]}))
+    for i, name in enumerate(['一月.xlsx', '二月.xlsx', '三月.xlsx', '四月.xlsx'])
+}
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """记录被解析的文件名"""
+    names = []
+    original = app_module.read_dataframe
+
+    def read_dataframe(source, *args, **kwargs):
+        names.append(source.filename)
+        return original(source, *args, **kwargs)
+
+    monkeypatch.setattr(app_module, 'read_dataframe', read_dataframe)
+    return names
+
+
+def merge(client, names, **form):
+    form.setdefault('add_source_column', 'true')
+    return client.post('/api/merge-files', data={
+        'files': [upload(FILES[name], name) for name in names], **form,
+    })
+
+
+def test_incremental_merge_matches_full_merge(client, parsed):
+    names = list(FILES)
+    read_xlsx(merge(client, names[:2], incremental='true', master='月度'))
+    assert parsed == names[:2]
+
+    parsed.clear()
+    incremental = read_xlsx(merge(client, names, incremental='true', master='月度'))
+    assert parsed == names[2:]
+
+    full = read_xlsx(merge(client, names))
+    pd.testing.assert_frame_equal(incremental, full)
+
+
+def test_changed_order_rebuilds(client, parsed):
+    names = list(FILES)
+    merge(client, names[:2], incremental='true', master='月度')
+    parsed.clear()
+
+    reordered = [names[1], names[0], names[2]]
+    result = read_xlsx(merge(client, reordered, incremental='true', master='月度'))
+    assert parsed == reordered
+    pd.testing.assert_frame_equal(result, read_xlsx(merge(client, reordered)))
+
+
+def test_masters_are_separated_by_name_and_name_is_required(client, parsed):
+    names = list(FILES)
+    assert merge(client, names[:1], incremental='true').status_code == 400
+
+    merge(client, names[:2], incremental='true', master='甲')
+    parsed.clear()
+    merge(client, names[:3], incremental='true', master='乙')
+    assert parsed == names[:3]
+
+
+def test_csv_output(client):
+    response = merge(client, list(FILES)[:2], output_format='csv')
+    assert response.status_code == 200
+    assert len(pd.read_csv(io.BytesIO(response.data), encoding='utf-8-sig')) == 5
+
+
+def test_load_refreshes_ttl_and_expired_masters_are_removed(tmp_path):
+    store = MasterStore(str(tmp_path), ttl_seconds=100)
+    df = pd.DataFrame({'a': [1, 2]})
+    store.save('k', df, [['a.xlsx', '0' * 64]])
+    manifest_path = tmp_path / 'k.json'
+
+    old = time.time() - 90
+    os.utime(manifest_path, (old, old))
+    loaded, inputs = store.load('k')
+    pd.testing.assert_frame_equal(loaded, df)
+    assert inputs == [['a.xlsx', '0' * 64]]
+    assert os.path.getmtime(manifest_path) > old + 60
+
+    expired = time.time() - 200
+    os.utime(manifest_path, (expired, expired))
+    assert store.load('k') is None
+    store.cleanup()
+    assert os.listdir(tmp_path) == []
+
+
+def test_save_replaces_previous_data_file(tmp_path):
+    store = MasterStore(str(tmp_path), ttl_seconds=100)
+    store.save('k', pd.DataFrame({'a': [1]}), [])
+    store.save('k', pd.DataFrame({'a': [1, 2]}), [])
+    assert len(store.load('k')[0]) == 2
+    assert len([name for name in os.listdir(tmp_path) if not name.endswith('.json')]) == 1
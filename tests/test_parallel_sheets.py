@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from app import app as flask_app, read_excel_sheets
+from parallel_sheets import assign_sheets
+
+
+def test_assign_sheets_balances_sizes_and_keeps_order():
+    groups = assign_sheets([50, 10, 40, 30, 20], 2)
+    assert sorted(i for group in groups for i in group) == [0, 1, 2, 3, 4]
+    assert all(group == sorted(group) for group in groups)
+    loads = sorted(sum([50, 10, 40, 30, 20][i] for i in group) for group in groups)
+    assert loads == [70, 80]
+    assert assign_sheets([5], 4) == [[0]]
+
+
+@pytest.fixture
+def parallel_app(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SHEET_PARSE_WORKERS', 2)
+    monkeypatch.setitem(app.config, 'SHEET_PARSE_MIN_BYTES', 0)
+    yield app
+    pool = app.extensions.pop('sheet_pool', None)
+    if pool is not None:
+        pool.shutdown()
+
+
+def test_default_is_serial():
+    assert flask_app.config['SHEET_PARSE_WORKERS'] == 1
+
+
+def test_parallel_parse_matches_serial(parallel_app, tmp_path):
+    path = tmp_path / 'book.xlsx'
+    with pd.ExcelWriter(path) as writer:
+        for i in range(4):
+            pd.DataFrame({'月份': [i] * (i + 1) * 10, '金额': range((i + 1) * 10)}).to_excel(
+                writer, sheet_name=f'{i + 1}月', index=False)
+
+    with parallel_app.test_request_context():
+        parallel = read_excel_sheets(str(path), parallel=True)
+    assert 'sheet_pool' in parallel_app.extensions
+
+    serial = read_excel_sheets(str(path))
+    assert [name for name, _ in parallel] == [name for name, _ in serial] == ['1月', '2月', '3月', '4月']
+    for (_, left), (_, right) in zip(parallel, serial):
+        pd.testing.assert_frame_equal(left, right)
@@ -0,0 +1,66 @@
+import json
+
+import pandas as pd
+import pytest
+
+from conftest import read_xlsx, upload, xlsx_bytes
+
+
+def post_pipeline(client, frames, steps):
+    files = [upload(xlsx_bytes(df), name) for name, df in frames]
+    return client.post('/api/pipeline', data={'files': files, 'steps': json.dumps(steps)})
+
+
+def test_merge_files_flags_accept_form_strings(client):
+    first = pd.DataFrame({'部门': ['销售部', '技术部']})
+    second = pd.DataFrame({'部门': ['财务部', '人事部']})
+
+    merged = read_xlsx(post_pipeline(client, [('a.xlsx', first), ('b.xlsx', second)],
+                                     [{'op': 'merge_files', 'keep_headers': 'false'}]))
+    assert merged['部门'].tolist() == ['销售部', '技术部', '财务部', '人事部']
+
+    merged = read_xlsx(post_pipeline(client, [('a.xlsx', first), ('b.xlsx', second)],
+                                     [{'op': 'merge_files', 'keep_headers': True, 'add_source_column': 'true'}]))
+    assert merged['部门'].tolist() == ['销售部', '技术部', '人事部']
+    assert merged['来源文件'].tolist() == ['a.xlsx', 'a.xlsx', 'b.xlsx']
+
+
+def test_filter_data_matches_route(client):
+    first = pd.DataFrame({'部门': ['销售部', '技术部'], '金额': [1, 2]})
+    second = pd.DataFrame({'部门': ['销售部', '财务部'], '金额': [3, 4]})
+    form = {'column_name': '部门', 'condition': '等于', 'value': '销售部'}
+
+    route_df = read_xlsx(client.post('/api/filter-data', data={
+        'files': [upload(xlsx_bytes(first), 'a.xlsx'), upload(xlsx_bytes(second), 'b.xlsx')], **form}))
+    pipeline_df = read_xlsx(post_pipeline(client, [('a.xlsx', first), ('b.xlsx', second)],
+                                          [{'op': 'filter_data', **form}]))
+
+    pd.testing.assert_frame_equal(route_df, pipeline_df)
+    assert pipeline_df['来源文件'].tolist() == ['a.xlsx', 'b.xlsx']
+
+
+def test_filter_after_merge_keeps_source_column(client):
+    first = pd.DataFrame({'部门': ['销售部']})
+    second = pd.DataFrame({'部门': ['技术部'] * 2})
+    result = read_xlsx(post_pipeline(client, [('a.xlsx', first), ('b.xlsx', second)], [
+        {'op': 'merge_files', 'keep_headers': 'false', 'add_source_column': 'true'},
+        {'op': 'filter_data', 'column_name': '部门', 'condition': '等于', 'value': '技术部'},
+    ]))
+    assert result['来源文件'].tolist() == ['b.xlsx', 'b.xlsx']
+
+
+def test_invalid_step_is_rejected(client):
+    response = post_pipeline(client, [('a.xlsx', pd.DataFrame({'a': [1]}))], [{'op': 'unknown'}])
+    assert response.status_code == 400
+    assert '不支持的操作' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('step, message', [
+    ({'op': 'delete_columns', 'columns': 5}, '第1步 (delete_columns): 参数 columns'),
+    ({'op': 'find_replace', 'find_text': 'a', 'replace_text': None}, '第1步 (find_replace): 参数 replace_text'),
+    ({'op': 'merge_files', 'keep_headers': 1}, '第1步 (merge_files): 参数 keep_headers'),
+])
+def test_wrong_field_types_are_rejected(client, step, message):
+    response = post_pipeline(client, [('a.xlsx', pd.DataFrame({'a': [1]}))], [step])
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith(message)
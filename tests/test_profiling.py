@@ -0,0 +1,52 @@
+import platform
+import sys
+
+import pandas as pd
+import pytest
+
+from conftest import upload, xlsx_bytes
+
+TOKEN = 'secret-token'
+
+
+@pytest.fixture
+def admin_app(app):
+    app.config.update(ADMIN_TOKEN=TOKEN, PROFILING_SAMPLE_RATE=0.0)
+    yield app
+    app.config.update(ADMIN_TOKEN=None, PROFILING_SAMPLE_RATE=0.0)
+
+
+def merge(client, **headers):
+    df = pd.DataFrame({'a': [1, 2]})
+    return client.post('/api/merge-files', headers=headers, data={
+        'files': [upload(xlsx_bytes(df), 'a.xlsx')],
+        'nonce': str(id(headers)),
+    })
+
+
+def test_token_only_accepted_in_header(client, admin_app):
+    assert client.get(f'/api/admin/profiles?token={TOKEN}').status_code == 403
+    assert client.get('/api/admin/profiles', headers={'X-Admin-Token': TOKEN}).status_code == 200
+
+
+def test_admin_requested_profile(client, admin_app):
+    response = merge(client, **{'X-Profile': '1', 'X-Admin-Token': TOKEN})
+    profile_id = response.headers['X-Profile-Id']
+
+    listing = client.get('/api/admin/profiles', headers={'X-Admin-Token': TOKEN}).get_json()
+    assert [meta['id'] for meta in listing['profiles']] == [profile_id]
+    meta = listing['profiles'][0]
+    assert meta['python'] == platform.python_version()
+    assert meta['all_threads'] == (sys.version_info >= (3, 12))
+    assert meta['thread']
+    summary = client.get(f'/api/admin/profiles/{profile_id}?format=text', headers={'X-Admin-Token': TOKEN})
+    assert summary.status_code == 200
+
+
+def test_sampled_request_does_not_expose_profile_id(client, admin_app):
+    admin_app.config['PROFILING_SAMPLE_RATE'] = 1.0
+    assert 'X-Profile-Id' not in merge(client).headers
+    assert 'X-Profile-Id' not in merge(client, **{'X-Profile': '1', 'X-Admin-Token': 'wrong'}).headers
+
+    listing = client.get('/api/admin/profiles', headers={'X-Admin-Token': TOKEN}).get_json()
+    assert len(listing['profiles']) == 2
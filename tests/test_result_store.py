@@ -0,0 +1,60 @@
+import io
+
+import pandas as pd
+
+from conftest import upload, xlsx_bytes
+from result_store import ResultStore, compute_result_id
+
+
+# xlsx中记录了创建时间，只生成一次，保证每次请求的上传内容相同
+SAMPLE = xlsx_bytes(pd.DataFrame({'a': [1, 2, 3]}))
+
+
+def merge_request(client):
+    return client.post('/api/merge-files', data={
+        'files': [upload(SAMPLE, 'a.xlsx'), upload(SAMPLE, 'b.xlsx')],
+    })
+
+
+def test_put_get_and_evict_least_recently_used(tmp_path):
+    store = ResultStore(str(tmp_path), max_bytes=10, ttl_seconds=60)
+    first = store.put('a' * 64, io.BytesIO(b'123456'), 'a.txt', 'text/plain')
+    assert open(first['path'], 'rb').read() == b'123456'
+    assert store.get('a' * 64)['size'] == 6
+
+    store.put('b' * 64, io.BytesIO(b'7890ab'), 'b.txt', 'text/plain')
+    assert store.get('a' * 64) is None
+    assert store.get('b' * 64) is not None
+
+    assert store.put('c' * 64, io.BytesIO(b'x' * 11), 'c.txt', 'text/plain') is None
+    assert store.get('../' + 'a' * 61) is None
+
+
+def test_result_id_depends_on_version():
+    assert compute_result_id('op', {}, [], 'v1') != compute_result_id('op', {}, [], 'v2')
+
+
+def test_repeated_request_is_served_from_store(client, app):
+    first = merge_request(client)
+    second = merge_request(client)
+    assert first.status_code == second.status_code == 200
+    assert first.headers['X-Result-Id'] == second.headers['X-Result-Id']
+
+    app.config['EXCEL_MAX_ROWS'] = 1000
+    try:
+        third = merge_request(client)
+    finally:
+        app.config['EXCEL_MAX_ROWS'] = 1048576
+    assert third.headers['X-Result-Id'] != first.headers['X-Result-Id']
+
+
+def test_download_supports_range_and_etag(client):
+    result = merge_request(client)
+    url = f"/api/results/{result.headers['X-Result-Id']}"
+
+    partial = client.get(url, headers={'Range': 'bytes=0-99'})
+    assert partial.status_code == 206
+    assert partial.data == result.data[:100]
+
+    cached = client.get(url, headers={'If-None-Match': result.headers['ETag']})
+    assert cached.status_code == 304
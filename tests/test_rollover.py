@@ -0,0 +1,84 @@
+import io
+import zipfile
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from app import create_temp_workbook
+from conftest import csv_bytes, upload, xlsx_bytes
+from xlsx_stream import count_sheet_rows, split_rows, workbook_sheets
+
+
+@pytest.fixture
+def small_sheets(app, monkeypatch):
+    # 每个sheet最多4行：表头加3行数据
+    monkeypatch.setitem(app.config, 'EXCEL_MAX_ROWS', 4)
+    return app
+
+
+def test_split_rows_at_the_limit():
+    df = pd.DataFrame({'a': range(6)})
+    assert len(split_rows(df, 7)) == 1
+    assert [len(part) for part in split_rows(df, 6)] == [5, 1]
+    assert [len(part) for part in split_rows(df, 4)] == [3, 3]
+
+
+def test_merge_rolls_over_to_more_sheets(client, small_sheets):
+    df = pd.DataFrame({'a': range(7)})
+    response = client.post('/api/merge-files', data={
+        'files': [upload(csv_bytes(df), 'a.csv')], 'keep_headers': 'false',
+    })
+    assert response.status_code == 200
+    wb = openpyxl.load_workbook(io.BytesIO(response.data))
+    assert wb.sheetnames == ['Sheet1', 'Sheet2', 'Sheet3']
+    assert [ws.max_row for ws in wb.worksheets] == [4, 4, 2]
+    assert all(ws['A1'].value == 'a' for ws in wb.worksheets)
+
+    frames = pd.read_excel(io.BytesIO(response.data), sheet_name=None)
+    assert pd.concat(frames.values())['a'].tolist() == list(range(7))
+
+
+def test_rollover_to_files(client, small_sheets):
+    df = pd.DataFrame({'a': range(4)})
+    response = client.post('/api/merge-files', data={
+        'files': [upload(csv_bytes(df), 'a.csv')], 'keep_headers': 'false', 'rollover': 'files',
+    })
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.data)) as zf:
+        names = sorted(zf.namelist())
+        assert len(names) == 2
+        assert [len(pd.read_excel(io.BytesIO(zf.read(name)))) for name in names] == [3, 1]
+
+
+def test_named_sheets_continue_with_suffix(small_sheets):
+    output = create_temp_workbook([('数据', pd.DataFrame({'a': range(5)})), ('其他', pd.DataFrame({'a': [1]}))])
+    assert openpyxl.load_workbook(output).sheetnames == ['数据', '数据_2', '其他']
+
+
+def test_row_estimate_counts_without_parsing(client, small_sheets):
+    content = xlsx_bytes(pd.DataFrame({'a': range(10)}))
+    response = client.post('/api/row-estimate', data={
+        'operation': 'merge_files', 'files': [upload(content, 'a.xlsx'), upload(content, 'b.xlsx')],
+    })
+    result = response.get_json()
+    assert result['rows'] == 20
+    assert result['parts'] == 7
+    assert 'warning' in result
+
+
+def test_count_sheet_rows_without_dimension():
+    content = io.BytesIO()
+    with zipfile.ZipFile(content, 'w') as zf:
+        zf.writestr('xl/_rels/workbook.xml.rels',
+                    '<Relationships><Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+                    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+                    '</Relationships>')
+        zf.writestr('xl/workbook.xml', '<workbook><sheets><sheet name="数据" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        rows = ''.join(f'<row r="{i}"><c r="A{i}"><v>{i}</v></c></row>' for i in range(1, 5001))
+        zf.writestr('xl/worksheets/sheet1.xml', f'<worksheet><dimension ref="A1"/><sheetData>{rows}</sheetData></worksheet>')
+
+    with zipfile.ZipFile(content) as zf:
+        sheets = workbook_sheets(zf)
+        assert sheets == [('数据', 'xl/worksheets/sheet1.xml')]
+        assert count_sheet_rows(zf, sheets[0][1]) == 5000
@@ -0,0 +1,68 @@
+import io
+import zipfile
+
+import openpyxl
+from openpyxl.styles import Font
+
+from xlsx_inplace import replace_in_workbook, _replace_string_items, _SI_PATTERN, _IS_PATTERN
+
+
+def styled_workbook():
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(['部门', '备注'])
+    ws.append(['销售部', '销售部A'])
+    ws.append(['销售部', 'R&D'])
+    ws['A2'].font = Font(bold=True)
+    ws['C1'] = '=COUNTA(A:A)'
+    ws.merge_cells('D1:E1')
+    ws.column_dimensions['B'].width = 30
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def replace(content, find_text, replace_text):
+    output = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(content)) as source_zip:
+        count = replace_in_workbook(source_zip, output, find_text, replace_text)
+    output.seek(0)
+    return count, openpyxl.load_workbook(output)
+
+
+def test_whole_cell_replace_keeps_formatting():
+    count, wb = replace(styled_workbook(), '销售部', '市场部 & <总部>')
+    ws = wb.active
+
+    assert count >= 1
+    assert [ws['A2'].value, ws['A3'].value] == ['市场部 & <总部>'] * 2
+    assert ws['B2'].value == '销售部A'
+    assert ws['A2'].font.bold is True
+    assert ws['C1'].value == '=COUNTA(A:A)'
+    assert [str(r) for r in ws.merged_cells.ranges] == ['D1:E1']
+    assert ws.column_dimensions['B'].width == 30
+
+
+def test_special_characters_are_matched_unescaped():
+    count, wb = replace(styled_workbook(), 'R&D', '研发')
+    assert count == 1
+    assert wb.active['B3'].value == '研发'
+
+
+def test_rich_text_and_phonetic_runs():
+    xml = ('<sst><si><r><rPr><b/></rPr><t>销售</t></r><r><t>部</t></r></si>'
+           '<si><t>销售部</t><rPh sb="0" eb="1"><t>ハンバイ</t></rPh></si>'
+           '<si><t>其他</t></si></sst>')
+    result, count = _replace_string_items(xml, _SI_PATTERN, 'si', '销售部', '市场部')
+    assert count == 2
+    assert result.count('<t xml:space="preserve">市场部</t>') == 2
+    assert '<si><t>其他</t></si>' in result
+
+
+def test_inline_strings_with_namespace_prefix():
+    xml = ('<x:sheetData><x:c r="A1" t="inlineStr"><x:is><x:t>销售部</x:t></x:is></x:c>'
+           '<x:c r="A2" t="inlineStr"><x:is><x:t>技术部</x:t></x:is></x:c></x:sheetData>')
+    result, count = _replace_string_items(xml, _IS_PATTERN, 'is', '销售部', '市场部')
+    assert count == 1
+    assert '<x:is><x:t xml:space="preserve">市场部</x:t></x:is>' in result
+    assert '<x:t>技术部</x:t>' in result
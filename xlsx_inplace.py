@@ -0,0 +1,71 @@
+"""
+Excel批量操作工具箱 - 保留格式的查找替换
+直接修改xlsx中的共享字符串表和单元格XML，不经过DataFrame，样式、公式、合并单元格和列宽保持不变
+Author: StanleyChanH
+License: MIT
+"""
+
+import re
+import html
+import zipfile
+from xml.sax.saxutils import escape
+
+SHARED_STRINGS_PART = 'xl/sharedStrings.xml'
+WORKSHEET_PREFIX = 'xl/worksheets/'
+
+# 共享字符串条目 <si>...</si>，以及内联字符串 <is>...</is>（兼容带命名空间前缀的写法）
+_SI_PATTERN = re.compile(r'<((?:\w+:)?)si(?:\s[^>]*)?>(.*?)</\1si>', re.S)
+_IS_PATTERN = re.compile(r'<((?:\w+:)?)is(?:\s[^>]*)?>(.*?)</\1is>', re.S)
+# 文本节点 <t>...</t>
+_T_PATTERN = re.compile(r'<((?:\w+:)?)t(?:\s[^>]*)?>(.*?)</\1t>', re.S)
+# 拼音注音 <rPh>...</rPh>，不属于单元格显示的文本
+_RPH_PATTERN = re.compile(r'<((?:\w+:)?)rPh(?:\s[^>]*)?>.*?</\1rPh>', re.S)
+
+
+def _string_item_text(content):
+    """提取字符串条目（可能是富文本）的完整文本"""
+    content = _RPH_PATTERN.sub('', content)
+    return ''.join(html.unescape(match.group(2)) for match in _T_PATTERN.finditer(content))
+
+
+def _replace_string_items(xml, pattern, tag, find_text, replace_text):
+    """
+    替换文本与find_text完全相同的字符串条目（与pandas引擎的整格匹配一致）
+    返回(新的XML, 替换数量)
+    """
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        if _string_item_text(match.group(2)) != find_text:
+            return match.group(0)
+        count += 1
+        prefix = match.group(1)
+        return (f'<{prefix}{tag}><{prefix}t xml:space="preserve">{escape(replace_text)}'
+                f'</{prefix}t></{prefix}{tag}>')
+
+    return pattern.sub(replace, xml), count
+
+
+def replace_in_workbook(source_zip, output, find_text, replace_text):
+    """
+    在xlsx中执行整格查找替换，结果写入output（文件对象）
+    共享字符串表中的一个条目被替换后，所有引用它的单元格同时生效
+    返回替换的字符串条目数量
+    """
+    total = 0
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as target_zip:
+        for info in source_zip.infolist():
+            data = source_zip.read(info)
+
+            if info.filename == SHARED_STRINGS_PART:
+                xml, count = _replace_string_items(data.decode('utf-8'), _SI_PATTERN, 'si', find_text, replace_text)
+                data = xml.encode('utf-8')
+                total += count
+            elif info.filename.startswith(WORKSHEET_PREFIX) and b'inlineStr' in data:
+                xml, count = _replace_string_items(data.decode('utf-8'), _IS_PATTERN, 'is', find_text, replace_text)
+                data = xml.encode('utf-8')
+                total += count
+
+            target_zip.writestr(info, data)
+    return total
@@ -0,0 +1,190 @@
+"""
+Excel批量操作工具箱 - xlsx流式读写
+写入：按批逐行写入（openpyxl只写模式），超出单个sheet的行数上限时自动续写到下一个sheet
+读取：不解析单元格，直接从工作簿结构和sheet XML中获取sheet列表和行数；按块流式读取sheet
+Author: StanleyChanH
+License: MIT
+"""
+
+import re
+import html
+import posixpath
+
+# Excel单个sheet的行数上限（含表头）
+EXCEL_MAX_ROWS = 1048576
+
+# 每批转换并写入的行数
+WRITE_BATCH_ROWS = 10000
+
+WORKBOOK_PART = 'xl/workbook.xml'
+WORKBOOK_RELS_PART = 'xl/_rels/workbook.xml.rels'
+
+_SHEET_PATTERN = re.compile(r'<(?:\w+:)?sheet\s[^>]*>')
+_RELATIONSHIP_PATTERN = re.compile(r'<(?:\w+:)?Relationship\s[^>]*>')
+_DIMENSION_PATTERN = re.compile(rb'<(?:\w+:)?dimension\s+ref="[A-Z]*\d*:?[A-Z]*(\d+)"')
+_ROW_PATTERN = re.compile(rb'<(?:\w+:)?row[\s>/]')
+_ROW_NUMBER_PATTERN = re.compile(rb'<(?:\w+:)?row\s[^>]*?\br="(\d+)"')
+
+
+def _attribute(tag, pattern):
+    match = re.search(pattern, tag)
+    return html.unescape(match.group(1)) if match else None
+
+
+def workbook_sheets(zip_file):
+    """按工作簿中的顺序返回工作表的(sheet名, XML路径)列表（不含图表sheet）"""
+    rels = zip_file.read(WORKBOOK_RELS_PART).decode('utf-8')
+    targets = {}
+    for tag in _RELATIONSHIP_PATTERN.findall(rels):
+        if (_attribute(tag, r'\sType="([^"]*)"') or '').endswith('/worksheet'):
+            target = _attribute(tag, r'\sTarget="([^"]*)"')
+            part = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+            targets[_attribute(tag, r'\sId="([^"]*)"')] = part
+
+    workbook = zip_file.read(WORKBOOK_PART).decode('utf-8')
+    sheets = []
+    for tag in _SHEET_PATTERN.findall(workbook):
+        part = targets.get(_attribute(tag, r'\s\w+:id="([^"]*)"'))
+        if part is not None:
+            sheets.append((_attribute(tag, r'\sname="([^"]*)"'), part))
+    return sheets
+
+
+def count_sheet_rows(zip_file, part):
+    """
+    sheet的行数（含表头）
+    优先使用sheet开头的dimension声明；没有时流式扫描XML，取最后一行的行号
+    """
+    with zip_file.open(part) as f:
+        head = f.read(4096)
+        match = _DIMENSION_PATTERN.search(head)
+        # 只有单个单元格的dimension（如"A1"）可能是写入方没有计算范围，需要扫描确认
+        if match and b':' in match.group(0):
+            return int(match.group(1))
+
+        last_row = tag_count = 0
+        carry, chunk = b'', head
+        while True:
+            data = carry + chunk
+            if chunk:
+                # 最后一个'<'之后的内容可能是不完整的标签，留到和下一块拼接后再处理
+                cut = data.rfind(b'<')
+                data, carry = (data[:cut], data[cut:]) if cut >= 0 else (data, b'')
+            numbers = _ROW_NUMBER_PATTERN.findall(data)
+            if numbers:
+                last_row = int(numbers[-1])
+            tag_count += len(_ROW_PATTERN.findall(data))
+            if not chunk:
+                break
+            chunk = f.read(1024 * 1024)
+        return max(last_row, tag_count)
+
+
+def dedup_columns(columns, unnamed=()):
+    """
+    与pandas读取表头时相同的方式重命名重复的列名：a, a, a 变为 a, a.1, a.2
+    已存在的名称（如后面另有一列a.1）会被跳过；unnamed为空表头列的序号，与pandas一样最后处理
+    """
+    columns = list(columns)
+    counts = {}
+    order = [i for i in range(len(columns)) if i not in unnamed] + list(unnamed)
+    for i in order:
+        column = columns[i]
+        count = counts.get(column, 0)
+        if count > 0:
+            original = column
+            while count > 0:
+                counts[original] = count + 1
+                column = f'{original}.{count}'
+                count = count + 1 if column in columns else counts.get(column, 0)
+            columns[i] = column
+        counts[column] = count + 1
+    return columns
+
+
+def iter_sheet_chunks(path, chunk_rows):
+    """
+    流式读取第一个sheet（openpyxl只读模式），每次返回最多chunk_rows行的DataFrame
+    第一行作为表头，空表头与pandas一样命名为"Unnamed: <序号>"，重复的列名同样重命名为"<列名>.1"等
+    """
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    # 上传的临时文件没有扩展名，openpyxl只接受扩展名正确的路径，因此传入文件对象
+    with open(path, 'rb') as f:
+        workbook = load_workbook(f, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            unnamed = [i for i, name in enumerate(header) if name is None]
+            columns = dedup_columns(
+                [f'Unnamed: {i}' if name is None else name for i, name in enumerate(header)], unnamed)
+            width = len(columns)
+
+            batch = []
+            for row in rows:
+                if len(row) != width:
+                    row = (tuple(row) + (None,) * width)[:width]
+                batch.append(row)
+                if len(batch) >= chunk_rows:
+                    yield pd.DataFrame.from_records(batch, columns=columns)
+                    batch = []
+            if batch:
+                yield pd.DataFrame.from_records(batch, columns=columns)
+        finally:
+            workbook.close()
+
+
+def split_rows(dataframe, max_rows=EXCEL_MAX_ROWS):
+    """按单个sheet的行数上限切分DataFrame（每部分都带表头），不超过上限时返回原DataFrame"""
+    per_sheet = max_rows - 1
+    if len(dataframe) <= per_sheet:
+        return [dataframe]
+    return [dataframe.iloc[start:start + per_sheet] for start in range(0, len(dataframe), per_sheet)]
+
+
+def _cell_value(value):
+    """numpy标量转为Python值（openpyxl只识别Python类型）"""
+    return value.item() if hasattr(value, 'item') and not isinstance(value, (str, bytes)) else value
+
+
+def write_workbook(output, sheet_frames):
+    """
+    以只写模式逐行写入xlsx，sheet_frames为(sheet名, DataFrame)列表
+    每个DataFrame按WRITE_BATCH_ROWS分批转换，内存中不会同时存在整张表的单元格对象
+    表头样式与pandas.to_excel一致（粗体、细边框、居中）
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    side = Side(style='thin')
+    header_font = Font(bold=True)
+    header_border = Border(left=side, right=side, top=side, bottom=side)
+    header_alignment = Alignment(horizontal='center', vertical='top')
+
+    workbook = Workbook(write_only=True)
+    for sheet_name, dataframe in sheet_frames:
+        sheet = workbook.create_sheet(sheet_name)
+
+        header = []
+        for column in dataframe.columns:
+            cell = WriteOnlyCell(sheet, value=_cell_value(column))
+            cell.font = header_font
+            cell.border = header_border
+            cell.alignment = header_alignment
+            header.append(cell)
+        sheet.append(header)
+
+        for start in range(0, len(dataframe), WRITE_BATCH_ROWS):
+            batch = dataframe.iloc[start:start + WRITE_BATCH_ROWS]
+            # 转为object后数值都是Python类型，缺失值统一为None（写为空单元格）
+            batch = batch.astype(object).where(batch.notna(), None)
+            for row in batch.itertuples(index=False, name=None):
+                sheet.append(row)
+
+    if not sheet_frames:
+        workbook.create_sheet('Sheet1')
+    workbook.save(output)